@@ -125,7 +125,7 @@ class Graph(object):
         for no, node in enumerate(sorted_nodes):
             node.no = no
 
-    def to_nnoir(self, name=None):
+    def to_nnoir(self, name=None, version=0):
 
         def _value(node):
             return nnoir.Value(_variable_elem_name(node), node.node)
@@ -150,7 +150,7 @@ class Graph(object):
             list(map(_variable_elem_name, self.output_variables)),
             values,
             list(map(_function, filter(lambda node: not isinstance(node.node, variable.Variable), sorted_nodes)))
-        ).pack()
+        ).pack(version)
 
 
 def _variable_elem_name(node):
@@ -1,7 +1,10 @@
 from .nnoir import NNOIR
 from .load import load
+from .info import inspect
 from .value import Value
+from .runtime import Runtime
 from . import functions
+from . import optimize
 from nnoir import _version
 
 __version__ = _version.__version__
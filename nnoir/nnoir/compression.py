@@ -0,0 +1,73 @@
+import functools
+import lzma
+import zlib
+import numpy
+
+CODECS = {
+    b'zlib': (zlib.compress, zlib.decompress),
+    b'lzma': (lzma.compress, lzma.decompress),
+}
+CHUNK_SIZE = 1 << 20
+
+
+def compress(array, codec, shuffle=False, chunk_size=CHUNK_SIZE):
+    '''Compress the data of a C-contiguous ``array`` chunk by chunk.
+
+    Returns ``(chunks, info)`` where ``chunks`` are the compressed bytes and
+    ``info`` the entry fields describing them. Byte shuffling (grouping the
+    n-th byte of every element together) is only applied to float tensors.
+    '''
+    compress_chunk = CODECS[codec][0]
+    shuffle = shuffle and array.dtype.kind == 'f' and array.dtype.itemsize > 1
+    itemsize = array.dtype.itemsize
+    chunk_size = max(chunk_size // itemsize, 1) * itemsize
+    raw = array.reshape(-1).view(numpy.uint8)
+    chunks = []
+    for i in range(0, len(raw), chunk_size):
+        piece = raw[i:i + chunk_size]
+        if shuffle:
+            piece = piece.reshape(-1, itemsize).T.copy()
+        chunks.append(compress_chunk(piece))
+    info = {
+        b'compression': codec,
+        b'shuffle': shuffle,
+        b'chunk_size': chunk_size,
+        b'chunks': [len(c) for c in chunks]
+    }
+    return chunks, info
+
+
+def decompressor(buf, entry):
+    '''Prepare decompression of the tensor described by table ``entry``.
+
+    Returns ``(array, jobs)``. ``array`` holds the tensor once every callable
+    in ``jobs`` has been run; the jobs write disjoint parts of it and the
+    codecs release the GIL, so they can run concurrently in threads.
+    '''
+    decompress_chunk = CODECS[entry[b'compression']][1]
+    dtype = numpy.dtype(entry[b'dtype'].decode())
+    array = numpy.empty(tuple(entry[b'shape']), dtype=dtype)
+    raw = array.reshape(-1).view(numpy.uint8)
+    itemsize = dtype.itemsize if entry[b'shuffle'] else 1
+
+    def job(start, stop, position):
+        piece = numpy.frombuffer(decompress_chunk(buf[start:stop]), dtype=numpy.uint8)
+        out = raw[position:position + len(piece)]
+        if itemsize > 1:
+            out.reshape(-1, itemsize)[...] = piece.reshape(itemsize, -1).T
+        else:
+            out[...] = piece
+
+    jobs = []
+    start = entry[b'offset']
+    for i, size in enumerate(entry[b'chunks']):
+        jobs.append(functools.partial(job, start, start + size, i * entry[b'chunk_size']))
+        start += size
+    return array, jobs
+
+
+def decompress(buf, entry):
+    array, jobs = decompressor(buf, entry)
+    for job in jobs:
+        job()
+    return array
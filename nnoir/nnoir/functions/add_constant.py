@@ -1,4 +1,5 @@
 from .function import Function
+import numpy as np
 
 
 class AddConstant(Function):
@@ -7,5 +8,5 @@ class AddConstant(Function):
         optional_params = set()
         super(AddConstant, self).__init__(inputs, outputs, params, required_params, optional_params)
 
-    def run(self, x):
-        return x + self.params['value']
+    def run(self, x, out=None):
+        return np.add(x, self.params['value'], out=out)
@@ -1,3 +1,5 @@
+import functools
+import numpy as np
 from .function import Function
 from . import util
 
@@ -13,13 +15,28 @@ class AveragePooling2D(Function):
         super(AveragePooling2D, self).__init__(inputs, outputs, params, required_params, optional_params)
 
     def run(self, x):
+        kernel = tuple(self.params['kernel'])
+        if util.is_global_pooling(x, kernel, self.params['pad_h'], self.params['pad_w']):
+            return x.mean(axis=(2, 3), keepdims=True)
+        img, col = util.im2col_cpu(x, kernel, self.params['stride'],
+                                   self.params['pad_h'], self.params['pad_w'])
+        y = util.reduce_windows(col, np.add)
+        dtype = x.dtype if x.dtype.kind == 'f' else np.float64
         if self.params['count_exclude_pad']:
-            img, col = util.im2col_cpu(x, self.params['kernel'], self.params['stride'],
-                                       self.params['pad_h'], self.params['pad_w'])
-            _, mask = util.im2col_cpu(np.ones(x.shape, dtype=np.int32), self.params['kernel'], self.params['stride'],
-                                      self.params['pad_h'], self.params['pad_w'])
-            return col.sum(axis=(2, 3)) / mask.sum(axis=(2, 3))
+            divisor = _divisor(x.shape[2:], kernel, tuple(self.params['stride']),
+                               tuple(self.params['pad_h']), tuple(self.params['pad_w']), dtype)
         else:
-            img, col = util.im2col_cpu(x, self.params['kernel'], self.params['stride'],
-                                       self.params['pad_h'], self.params['pad_w'])
-            return col.mean(axis=(2, 3))
+            divisor = np.array(kernel[0] * kernel[1], dtype=dtype)
+        return np.true_divide(y, divisor, dtype=dtype)
+
+
+@functools.lru_cache(maxsize=64)
+def _divisor(size, kernel, stride, pad_h, pad_w, dtype):
+    # number of non-padding cells in each window, as an (out_h, out_w) map
+    counts = []
+    for n, k, s, (pre, post) in zip(size, kernel, stride, (pad_h, pad_w)):
+        start = np.arange(util.get_conv_outsize(n, k, s, pre, post)) * s - pre
+        counts.append(np.minimum(start + k, n) - np.maximum(start, 0))
+    divisor = np.outer(counts[0], counts[1]).astype(dtype)
+    divisor.flags.writeable = False
+    return divisor
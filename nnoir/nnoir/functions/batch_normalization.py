@@ -13,9 +13,16 @@ class BatchNormalization(Function):
         super(BatchNormalization, self).__init__(inputs, outputs, params, required_params, optional_params)
 
     def run(self, x):
-        shape = (1, self.params['gamma'].size, 1, 1)
-        gamma = self.params['gamma'].reshape(shape)
-        beta = self.params['beta'].reshape(shape)
-        avg_mean = self.params['avg_mean'].reshape(shape)
-        avg_var = self.params['avg_var'].reshape(shape)
-        return gamma * (x - avg_mean) / np.sqrt(avg_var + self.params['eps']) + beta
+        scale, shift = self._prepare(('eps', 'avg_mean', 'avg_var', 'gamma', 'beta'), _affine)
+        R = x * scale
+        R += shift
+        return R
+
+
+def _affine(eps, avg_mean, avg_var, gamma, beta):
+    # gamma * (x - avg_mean) / sqrt(avg_var + eps) + beta as x * scale + shift
+    avg_mean, avg_var, gamma, beta = (np.asarray(p) for p in (avg_mean, avg_var, gamma, beta))
+    shape = (1, gamma.size, 1, 1)
+    scale = gamma / np.sqrt(avg_var + eps)
+    shift = beta - avg_mean * scale
+    return scale.reshape(shape), shift.reshape(shape)
@@ -9,7 +9,7 @@ class Bias(Function):
         optional_params = set()
         super(Bias, self).__init__(inputs, outputs, params, required_params, optional_params)
 
-    def run(self, x):
+    def run(self, x, out=None):
         shape_post_len = len(x.shape) - self.params['axis'] - len(self.params['b'].shape)
         shape = (1,)*self.params['axis'] + self.params['b'].shape + (1,)*shape_post_len
-        return x + np.reshape(self.params['b'], shape)
+        return np.add(x, np.reshape(self.params['b'], shape), out=out)
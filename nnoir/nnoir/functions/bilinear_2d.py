@@ -1,3 +1,4 @@
+import functools
 import numpy as np
 from .function import Function
 
@@ -12,22 +13,25 @@ class Bilinear2D(Function):
         out_h = self.params['size'][0]
         out_w = self.params['size'][1]
         batch, ch, in_h, in_w = x.shape
-        h_scale = float(in_h-1) / float(out_h-1)
-        w_scale = float(in_w-1) / float(out_w-1)
-        V = (np.arange(out_h) * h_scale).reshape(out_h, 1)
-        V0 = np.maximum(0, np.minimum(np.floor(V), in_h - 2)).astype('int32')
-        V1 = V0 + 1
-        U = (np.arange(out_w) * w_scale).reshape(1, out_w)
-        U0 = np.maximum(0, np.minimum(np.floor(U), in_w - 2)).astype('int32')
-        U1 = U0 + 1
-        W00 = (U1 - U) * (V1 - V)
-        W01 = (U - U0) * (V1 - V)
-        W10 = (U1 - U) * (V - V0)
-        W11 = (U - U0) * (V - V0)
-        x0 = x[:, :, V0.reshape(out_h), :]
-        x1 = x[:, :, V1.reshape(out_h), :]
-        result = W00 * x0[:, :, :, U0.reshape(out_w)] + \
-            W01 * x0[:, :, :, U1.reshape(out_w)] + \
-            W10 * x1[:, :, :, U0.reshape(out_w)] + \
-            W11 * x1[:, :, :, U1.reshape(out_w)]
-        return result
+        dtype = x.dtype if x.dtype.kind == 'f' else np.dtype(np.float64)
+        # the interpolation is separable: rows, then columns, each a GEMM
+        Ah = _interpolation(in_h, out_h, dtype)
+        Aw = _interpolation(in_w, out_w, dtype)
+        return np.matmul(Ah, np.matmul(x.astype(dtype, copy=False), Aw.T))
+
+
+@functools.lru_cache(maxsize=64)
+def _interpolation(in_size, out_size, dtype):
+    # (out_size, in_size) matrix of the two-tap weights of each output
+    # position, with the corners of input and output aligned
+    scale = float(in_size - 1) / float(out_size - 1) if out_size > 1 else 0.0
+    position = np.arange(out_size) * scale
+    i0 = np.clip(np.floor(position), 0, max(in_size - 2, 0)).astype(np.intp)
+    i1 = np.minimum(i0 + 1, in_size - 1)
+    rows = np.arange(out_size)
+    A = np.zeros((out_size, in_size))
+    A[rows, i0] += i0 + 1 - position
+    A[rows, i1] += position - i0
+    A = A.astype(dtype)
+    A.flags.writeable = False
+    return A
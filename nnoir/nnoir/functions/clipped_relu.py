@@ -8,5 +8,5 @@ class ClippedReLU(Function):
         optional_params = set()
         super(ClippedReLU, self).__init__(inputs, outputs, params, required_params, optional_params)
 
-    def run(self, x):
-        return np.maximum(0, np.minimum(x, self.params['upper']))
+    def run(self, x, out=None):
+        return np.clip(x, 0, self.params['upper'], out=out)
@@ -1,9 +1,20 @@
 from .function import Function
 import numpy as np
+from . import fast_conv
 from . import util
 
 
 class Convolution2D(Function):
+    '''2D convolution.
+
+    ``engine`` selects the kernel used by ``run()``: ``'gemm'`` (im2col and
+    matmul, the default), ``'winograd'`` (F(2x2, 3x3), for 3x3 kernels with
+    stride and dilation 1), ``'fft'`` or ``'auto'``, which picks one from the
+    shape of the weights. It can be set per instance. The Winograd and FFT
+    engines round differently from ``'gemm'``.
+    '''
+    engine = 'gemm'
+
     def __init__(self, inputs, outputs, **params):
         required_params = {'W',
                            'b',
@@ -15,11 +26,88 @@ class Convolution2D(Function):
         optional_params = set()
         super(Convolution2D, self).__init__(inputs, outputs, params, required_params, optional_params)
 
-    def run(self, x):
-        kernel = (self.params['W'].shape[2], self.params['W'].shape[3])
-        img, col = util.im2col_cpu(x, kernel, self.params['stride'],
-                                   self.params['pad_h'],
-                                   self.params['pad_w'], self.params['dilate'])
-        R = np.tensordot(col, self.params['W'], ((1, 2, 3), (1, 2, 3))) + self.params['b']
-        R = np.rollaxis(R, 3, 1)
+    def run(self, x, out=None):
+        engine = self.engine if self.engine != 'auto' else self._auto_engine()
+        if engine == 'winograd':
+            R = self._run_winograd(x)
+        elif engine == 'fft':
+            R = self._run_fft(x)
+        elif engine == 'gemm':
+            return self._run_gemm(x, out)
+        else:
+            raise Exception('unknown convolution engine: {}'.format(engine))
+        if self.params['b'] is not None:
+            R += np.asarray(self.params['b'], dtype=R.dtype).reshape(-1, 1, 1)
+        if out is not None and out.shape == R.shape and out.dtype == R.dtype:
+            np.copyto(out, R)
+            return out
+        return R
+
+    def _auto_engine(self):
+        out_ch, in_ch, kh, kw = self.params['W'].shape
+        dy, dx = self.params['dilate']
+        if tuple(self.params['stride']) != (1, 1):
+            return 'gemm'
+        if (kh, kw) == (3, 3) and (dy, dx) == (1, 1) and in_ch >= 128:
+            return 'winograd'
+        if min((kh - 1) * dy, (kw - 1) * dx) >= 6 and in_ch >= 16:
+            return 'fft'
+        return 'gemm'
+
+    def _run_gemm(self, x, out=None):
+        W, b, (out_ch, in_ch, kh, kw) = self._prepare(('W', 'b', 'groups'), _layout)
+        groups = self.params['groups']
+        sy, sx = self.params['stride']
+        batch = x.shape[0]
+        if (kh, kw) == (1, 1) and not any(self.params['pad_h']) and not any(self.params['pad_w']):
+            # a 1x1 convolution is a plain GEMM over the channels
+            x = x[:, :, ::sy, ::sx]
+            out_h, out_w = x.shape[2:]
+            col = x.reshape(batch, groups, in_ch, out_h * out_w)
+        else:
+            img, col = util.im2col_cpu(x, (kh, kw), (sy, sx),
+                                       self.params['pad_h'],
+                                       self.params['pad_w'], self.params['dilate'])
+            out_h, out_w = col.shape[4:]
+            col = col.reshape(batch, groups, in_ch * kh * kw, out_h * out_w)
+        shape = (batch, out_ch, out_h, out_w)
+        if out is not None and out.shape == shape and out.dtype == np.result_type(W, col) and out.flags.c_contiguous:
+            R = out
+            np.matmul(W, col, out=out.reshape(col.shape[:2] + (out_ch // groups, out_h * out_w)))
+        else:
+            R = np.matmul(W, col).reshape(shape)
+        if b is not None:
+            R += b
         return R
+
+    def _run_winograd(self, x):
+        if self.params['W'].shape[2:] != (3, 3) or tuple(self.params['stride']) != (1, 1) or \
+                tuple(self.params['dilate']) != (1, 1):
+            raise Exception('the winograd engine requires a 3x3 kernel with stride 1 and dilation 1.')
+        U = self._prepare(('W', 'groups'), fast_conv.winograd_weight)
+        img, _ = util.im2col_cpu(x, (3, 3), (1, 1), self.params['pad_h'], self.params['pad_w'])
+        return fast_conv.winograd(img, U)
+
+    def _run_fft(self, x):
+        sy, sx = self.params['stride']
+        kernels = self._prepare(('W', 'groups'), _spectra)
+        img, _ = util.im2col_cpu(x, self.params['W'].shape[2:], (1, 1),
+                                 self.params['pad_h'], self.params['pad_w'], self.params['dilate'])
+        R = fast_conv.fft_conv(img, self.params['W'], self.params['groups'], self.params['dilate'], kernels)
+        return R if (sy, sx) == (1, 1) else R[:, :, ::sy, ::sx]
+
+
+def _layout(W, b, groups):
+    # W as a C-contiguous (groups, out_ch / groups, in_ch * kh * kw) stack of
+    # GEMM operands and b ready to broadcast over (batch, out_ch, h, w)
+    W = np.asarray(W)
+    out_ch, in_ch, kh, kw = W.shape
+    W_ = np.ascontiguousarray(W.reshape(groups, out_ch // groups, in_ch * kh * kw))
+    b_ = None if b is None else np.asarray(b, dtype=W.dtype).reshape(out_ch, 1, 1)
+    return W_, b_, W.shape
+
+
+def _spectra(W, groups):
+    # weight spectra are computed for the last padded input size by
+    # fast_conv.fft_conv
+    return {}
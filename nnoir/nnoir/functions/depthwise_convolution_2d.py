@@ -15,13 +15,40 @@ class DepthwiseConvolution2D(Function):
         super(DepthwiseConvolution2D, self).__init__(inputs, outputs, params, required_params, optional_params)
 
     def run(self, x):
-        W = self.params['W']
-        b = self.params['b']
-        kernel = (self.params['W'].shape[2], self.params['W'].shape[3])
-        img, col = util.im2col_cpu(x, kernel, self.params['stride'],
+        img, col = util.im2col_cpu(x, self.params['W'].shape[2:], self.params['stride'],
                                    self.params['pad_h'],
                                    self.params['pad_w'],
                                    self.params['dilate'])
+        # weights of a wider dtype than the input keep the matmul path, which
+        # accumulates in that wider dtype
+        if np.result_type(col, self.params['W']) == col.dtype:
+            return self._run_direct(col)
+        return self._run_im2col(col)
+
+    def _run_direct(self, col):
+        # accumulate the KY * KX shifted windows of the input, each scaled by
+        # its per-channel weight, into one (B, C, D, IY, IX) output
+        W = self.params['W']
+        b = self.params['b']
+        B, C, KY, KX, IY, IX = col.shape
+        D = W.shape[0]  # (D, C, KY, KX)
+        w_ = np.asarray(W).transpose(2, 3, 1, 0).reshape((KY, KX, 1, C, D, 1, 1))
+        y = np.empty((B, C, D, IY, IX), dtype=col.dtype)
+        tmp = np.empty_like(y)
+        np.multiply(col[:, :, None, 0, 0], w_[0, 0], out=y)
+        for j in range(KY):
+            for i in range(KX):
+                if j or i:
+                    np.multiply(col[:, :, None, j, i], w_[j, i], out=tmp)
+                    y += tmp
+        y = y.reshape((B, C * D, IY, IX))
+        if b is not None:
+            y += b[None, :, None, None]
+        return y
+
+    def _run_im2col(self, col):
+        W = self.params['W']
+        b = self.params['b']
         B, C, KY, KX, IY, IX = col.shape
         D = W.shape[0]  # (D, C, KY, KX)
         c_ = col.transpose(1, 0, 4, 5, 2, 3) .reshape((C, B * IY * IX, KY * KX))
@@ -1,4 +1,5 @@
 from .function import Function
+import numpy as np
 
 
 class Dropout(Function):
@@ -7,5 +8,8 @@ class Dropout(Function):
         optional_params = set()
         super(Dropout, self).__init__(inputs, outputs, params, required_params, optional_params)
 
-    def run(self, x):
-        return x
+    def run(self, x, out=None):
+        if out is None or out is x:
+            return x
+        np.copyto(out, x)
+        return out
@@ -8,8 +8,14 @@ class ELU(Function):
         optional_params = set()
         super(ELU, self).__init__(inputs, outputs, params, required_params, optional_params)
 
-    def run(self, x):
-        R = x.copy()
-        v = R < 0
-        R[v] = self.params['alpha'] * (np.exp(R[v]) - 1)
+    def run(self, x, out=None):
+        negative = x < 0
+        if out is None:
+            R = np.array(x)
+        else:
+            R = out
+            if R is not x:
+                np.copyto(R, x)
+        np.expm1(R, out=R, where=negative)
+        np.multiply(R, self.params['alpha'], out=R, where=negative)
         return R
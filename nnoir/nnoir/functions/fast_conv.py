@@ -0,0 +1,94 @@
+import numpy as np
+
+# F(2x2, 3x3) transforms; B^T and A^T are applied with additions below
+_G = np.array([[1.0, 0.0, 0.0],
+               [0.5, 0.5, 0.5],
+               [0.5, -0.5, 0.5],
+               [0.0, 0.0, 1.0]])
+
+
+def winograd_weight(W, groups):
+    '''Transform ``W`` (out_ch, in_ch, 3, 3) into ``G g G^T`` tiles laid out as (4, 4, groups, out_ch / groups, in_ch).
+
+    The tiles are floating point even for integer ``W``, as ``G`` has halves.
+    '''
+    W = np.asarray(W)
+    out_ch, in_ch = W.shape[:2]
+    U = np.einsum('ai,kcij,bj->abkc', _G, W, _G).astype(np.result_type(W.dtype, np.float32))
+    return np.ascontiguousarray(U.reshape(4, 4, groups, out_ch // groups, in_ch))
+
+
+def winograd(img, U):
+    '''Convolve the padded image ``img`` with the transformed 3x3 weights ``U`` (stride and dilation 1).'''
+    n, c, h, w = img.shape
+    _, _, groups, k, _ = U.shape
+    out_h = h - 2
+    out_w = w - 2
+    th = (out_h + 1) // 2
+    tw = (out_w + 1) // 2
+    if (h, w) != (2 * th + 2, 2 * tw + 2):
+        img = np.pad(img, ((0, 0), (0, 0), (0, 2 * th + 2 - h), (0, 2 * tw + 2 - w)), mode='constant')
+    sn, sc, sh, sw = img.strides
+    # overlapping 4x4 input tiles with a step of 2, as (4, 4, c, n, th, tw)
+    d = np.lib.stride_tricks.as_strided(img, (4, 4, c, n, th, tw), (sh, sw, sc, sn, 2 * sh, 2 * sw), writeable=False)
+    t = np.empty(d.shape, dtype=img.dtype)
+    _transform_input(d, t, 0)
+    V = np.empty(d.shape, dtype=img.dtype)
+    _transform_input(t, V, 1)
+    M = np.matmul(U, V.reshape(4, 4, groups, c // groups, n * th * tw))
+    M = M.reshape(4, 4, groups * k, n, th, tw)
+    t = np.empty((2, 4) + M.shape[2:], dtype=M.dtype)
+    _transform_output(M, t, 0)
+    # the 2x2 output tiles are written interleaved into (n, out_ch, 2 * th, 2 * tw)
+    Y = np.empty((n, groups * k, th, 2, tw, 2), dtype=M.dtype)
+    _transform_output(t, Y.transpose(3, 5, 1, 0, 2, 4), 1)
+    return Y.reshape(n, groups * k, 2 * th, 2 * tw)[:, :, :out_h, :out_w]
+
+
+def _transform_input(d, out, axis):
+    # B^T d along ``axis`` of the leading 4x4 tile axes
+    def at(x, i):
+        return x[i] if axis == 0 else x[:, i]
+    np.subtract(at(d, 0), at(d, 2), out=at(out, 0))
+    np.add(at(d, 1), at(d, 2), out=at(out, 1))
+    np.subtract(at(d, 2), at(d, 1), out=at(out, 2))
+    np.subtract(at(d, 1), at(d, 3), out=at(out, 3))
+
+
+def _transform_output(m, out, axis):
+    # A^T m along ``axis`` of the leading tile axes
+    def at(x, i):
+        return x[i] if axis == 0 else x[:, i]
+    np.add(at(m, 0), at(m, 1), out=at(out, 0))
+    np.add(at(out, 0), at(m, 2), out=at(out, 0))
+    np.subtract(at(m, 1), at(m, 2), out=at(out, 1))
+    np.subtract(at(out, 1), at(m, 3), out=at(out, 1))
+
+
+def fft_conv(img, W, groups, dilate, kernels):
+    '''Convolve the padded image ``img`` with ``W`` by FFT (stride 1).
+
+    ``kernels`` caches the spectra of the flipped and dilated weights for
+    the last padded image size only, as they are much larger than ``W``.
+    '''
+    n, c, h, w = img.shape
+    out_ch, in_ch, kh, kw = W.shape
+    dy, dx = dilate
+    kh = (kh - 1) * dy + 1
+    kw = (kw - 1) * dx + 1
+    if (h, w) not in kernels:
+        kernels.clear()
+        W = np.asarray(W)
+        k = np.zeros((out_ch, in_ch, kh, kw), dtype=W.dtype)
+        k[:, :, ::dy, ::dx] = W
+        # cross-correlation is a convolution with the flipped kernel
+        K = np.fft.rfft2(k[:, :, ::-1, ::-1], s=(h, w))
+        K = K.transpose(2, 3, 0, 1).reshape(h, K.shape[3], groups, out_ch // groups, in_ch)
+        kernels[(h, w)] = np.ascontiguousarray(K)
+    K = kernels[(h, w)]
+    X = np.fft.rfft2(img)
+    X = X.transpose(2, 3, 1, 0).reshape(h, X.shape[3], groups, c // groups, n)
+    Y = np.matmul(K, X)
+    Y = Y.reshape(h, Y.shape[1], out_ch, n).transpose(3, 2, 0, 1)
+    # the circular wrap-around only reaches the rows and columns dropped here
+    return np.fft.irfft2(Y, s=(h, w))[:, :, kh - 1:, kw - 1:].astype(img.dtype, copy=False)
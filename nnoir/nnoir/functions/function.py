@@ -1,6 +1,7 @@
 import io
 import numpy
 import nnoir
+from nnoir.lazy import LazyNDArray
 
 
 class Function(object):
@@ -14,20 +15,34 @@ class Function(object):
         self.inputs = inputs
         self.outputs = outputs
         self.params = params
+        self._prepared = {}
 
-    def dump(self):
-        def encode_ndarray(obj):
-            x = None
-            with io.BytesIO() as out:
-                numpy.save(out, obj.copy())
-                x = out.getvalue()
-            return {b'ndarray': x}
+    def _prepare(self, names, build):
+        '''Return ``build(*params)`` for the params ``names``, computing it once.
+
+        Results are cached per ``build`` and rebuilt when any of those params
+        has been replaced since; params modified in place are not detected.
+        The result keeps the materialized params, or copies of them, alive, so
+        ``LazyNDArray.release()`` does not free the memory of prepared params.
+        '''
+        params = tuple(self.params[name] for name in names)
+        cached = self._prepared.get(build)
+        if cached is None or any(a is not b for a, b in zip(cached[0], params)):
+            cached = (params, build(*params))
+            self._prepared[build] = cached
+        return cached[1]
+
+    def dump(self, encode_ndarray=None, encode_model=None):
+        if encode_ndarray is None:
+            encode_ndarray = _encode_ndarray
         binary_params = {}
         for k, v in self.params.items():
-            if type(v) is numpy.ndarray:
+            if type(v) is numpy.ndarray or type(v) is LazyNDArray or (type(v) is dict and b'ndarray' in v):
                 binary_params[k.encode()] = encode_ndarray(v)
+            elif type(v) is nnoir.NNOIR and encode_model is not None:
+                binary_params[k.encode()] = encode_model(v)
             elif type(v) is nnoir.NNOIR:
-                binary_params[k.encode()] = v.to_model()
+                binary_params[k.encode()] = v.to_model(encode_ndarray)
             else:
                 binary_params[k.encode()] = v
         return {
@@ -36,3 +51,17 @@ class Function(object):
             b'outputs': self.outputs,
             b'params': binary_params
         }
+
+
+def _encode_ndarray(obj):
+    if type(obj) is dict:
+        return obj
+    if type(obj) is LazyNDArray:
+        if obj.is_npy:
+            return {b'ndarray': bytes(obj.buf)}
+        obj = obj.decode()
+    x = None
+    with io.BytesIO() as out:
+        numpy.save(out, obj.copy())
+        x = out.getvalue()
+    return {b'ndarray': x}
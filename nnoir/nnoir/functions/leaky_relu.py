@@ -1,4 +1,5 @@
 from .function import Function
+import numpy as np
 
 
 class LeakyReLU(Function):
@@ -7,7 +8,13 @@ class LeakyReLU(Function):
         optional_params = set()
         super(LeakyReLU, self).__init__(inputs, outputs, params, required_params, optional_params)
 
-    def run(self, x):
-        R = x.copy()
-        R[R < 0] *= self.params['slope']
-        return R
+    def run(self, x, out=None):
+        slope = self.params['slope']
+        if out is None:
+            # the result is max(x, x * slope) for slope < 1, min otherwise
+            out = np.multiply(x, slope)
+            return np.maximum(out, x, out=out) if slope < 1 else np.minimum(out, x, out=out)
+        negative = x < 0
+        if out is not x:
+            np.copyto(out, x)
+        return np.multiply(out, slope, out=out, where=negative)
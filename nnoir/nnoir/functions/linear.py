@@ -9,5 +9,18 @@ class Linear(Function):
         optional_params = set()
         super(Linear, self).__init__(inputs, outputs, params, required_params, optional_params)
 
-    def run(self, x):
-        return x.dot(np.transpose(self.params['W'])) + self.params['b']
+    def run(self, x, out=None):
+        W, b = self._prepare(('W', 'b'), _layout)
+        if out is not None and (out.dtype != np.result_type(x, W) or out.shape != x.shape[:-1] + W.shape[1:]):
+            out = None
+        y = np.matmul(x, W, out=out)
+        if b is not None:
+            y += b
+        return y
+
+
+def _layout(W, b):
+    # W.T as a view, which BLAS takes without a copy, so memory-mapped
+    # weights stay shared, and a bias of the same dtype
+    W = np.asarray(W).T
+    return W, None if b is None else np.asarray(b, dtype=W.dtype)
@@ -12,12 +12,41 @@ class LocalResponseNormalization(Function):
         super(LocalResponseNormalization, self).__init__(inputs, outputs, params, required_params, optional_params)
 
     def run(self, x):
-        RA2 = np.square(x)
-        R = RA2.copy()
-        for i in range(1, self.params['n']//2 + 1):
-            R[:, i:] += RA2[:, :-i]
-            R[:, :-i] += RA2[:, i:]
-        R = self.params['k'] + self.params['alpha'] * R
-        R = R ** -self.params['beta']
-        R = x * R
-        return R
+        half = self.params['n'] // 2
+        batch, C = x.shape[:2]
+        w = 2 * half + 1
+        blocks = (C + half) // w + 2
+        # the squares, zero-padded along the channels so that the window of
+        # output channel c starts at c, split into blocks of the window size.
+        # A window is the suffix sum of its first block plus the exclusive
+        # prefix sum of the next one, which needs no subtraction and so keeps
+        # the precision of the input dtype.
+        shape = (batch, blocks * w) + x.shape[2:]
+        S = np.zeros((batch, blocks, w) + x.shape[2:], dtype=np.result_type(x.dtype, np.float32))
+        np.square(x, out=S.reshape(shape)[:, half:half + C])
+        # one scratch buffer holds the prefix sums, then the suffix sums
+        T = np.empty_like(S)
+        T[:, :, 0] = 0
+        for i in range(1, w):
+            np.add(T[:, :, i - 1], S[:, :, i - 1], out=T[:, :, i])
+        R = np.empty((batch, C) + x.shape[2:], dtype=S.dtype)
+        np.copyto(R, T.reshape(shape)[:, w:w + C])
+        T[:, :, w - 1] = S[:, :, w - 1]
+        for i in range(1, w):
+            np.add(T[:, :, w - i], S[:, :, w - 1 - i], out=T[:, :, w - 1 - i])
+        del S
+        R += T.reshape(shape)[:, :C]
+        R *= self.params['alpha']
+        R += self.params['k']
+        beta = self.params['beta']
+        if beta == 0.75:
+            # R ** -0.75 == 1 / (sqrt(R) * sqrt(sqrt(R)))
+            s = np.sqrt(R, out=T.reshape(shape)[:, :C])
+            np.sqrt(s, out=R)
+            R *= s
+            return np.divide(x, R, out=R)
+        elif beta == 0.5:
+            np.sqrt(R, out=R)
+            return np.divide(x, R, out=R)
+        np.power(R, -beta, out=R)
+        return np.multiply(x, R, out=R)
@@ -1,3 +1,4 @@
+import numpy as np
 from .function import Function
 from . import util
 
@@ -12,8 +13,10 @@ class MaxPooling2D(Function):
         super(MaxPooling2D, self).__init__(inputs, outputs, params, required_params, optional_params)
 
     def run(self, x):
+        if util.is_global_pooling(x, self.params['kernel'], self.params['pad_h'], self.params['pad_w']):
+            return x.max(axis=(2, 3), keepdims=True)
+        pval = -np.inf if x.dtype.kind == 'f' else np.iinfo(x.dtype).min
         img, col = util.im2col_cpu(x, self.params['kernel'], self.params['stride'],
                                    self.params['pad_h'], self.params['pad_w'],
-                                   pval=-float('inf'))
-        R = col.max(axis=(2, 3))
-        return R
+                                   pval=pval)
+        return util.reduce_windows(col, np.maximum)
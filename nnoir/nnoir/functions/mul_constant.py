@@ -1,4 +1,5 @@
 from .function import Function
+import numpy as np
 
 
 class MulConstant(Function):
@@ -7,5 +8,5 @@ class MulConstant(Function):
         optional_params = set()
         super(MulConstant, self).__init__(inputs, outputs, params, required_params, optional_params)
 
-    def run(self, x):
-        return x * self.params['value']
+    def run(self, x, out=None):
+        return np.multiply(x, self.params['value'], out=out)
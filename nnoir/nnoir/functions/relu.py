@@ -1,4 +1,5 @@
 from .function import Function
+import numpy as np
 
 
 class ReLU(Function):
@@ -7,7 +8,5 @@ class ReLU(Function):
         optional_params = set()
         super(ReLU, self).__init__(inputs, outputs, params, required_params, optional_params)
 
-    def run(self, x):
-        R = x.copy()
-        R[R < 0] = 0
-        return R
+    def run(self, x, out=None):
+        return np.maximum(x, 0, out=out)
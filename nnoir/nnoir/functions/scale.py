@@ -10,7 +10,9 @@ class Scale(Function):
         optional_params = set()
         super(Scale, self).__init__(inputs, outputs, params, required_params, optional_params)
 
-    def run(self, x):
+    def run(self, x, out=None):
         shape_post_len = len(x.shape) - self.params['axis'] - len(self.params['W'].shape)
         shape = (1,)*self.params['axis'] + self.params['W'].shape + (1,)*shape_post_len
-        return x * np.reshape(self.params['W'], shape) + np.reshape(self.params['b'], shape)
+        R = np.multiply(x, np.reshape(self.params['W'], shape), out=out)
+        R += np.reshape(self.params['b'], shape)
+        return R
@@ -8,5 +8,9 @@ class Sigmoid(Function):
         optional_params = set()
         super(Sigmoid, self).__init__(inputs, outputs, params, required_params, optional_params)
 
-    def run(self, x):
-        return np.tanh(x * 0.5) * 0.5 + 0.5
+    def run(self, x, out=None):
+        R = np.multiply(x, 0.5, out=out)
+        np.tanh(R, out=R)
+        R *= 0.5
+        R += 0.5
+        return R
@@ -9,4 +9,9 @@ class Softmax(Function):
         super(Softmax, self).__init__(inputs, outputs, params, required_params, optional_params)
 
     def run(self, x):
-        return np.exp(x) / np.sum(np.exp(x), self.params['axis'], keepdims=True)
+        axis = self.params['axis']
+        # exp(x - max) cannot overflow; the result is normalised in place
+        R = np.subtract(x, np.max(x, axis, keepdims=True))
+        np.exp(R, out=R)
+        R /= np.sum(R, axis, keepdims=True)
+        return R
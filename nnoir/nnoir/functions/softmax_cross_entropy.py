@@ -1,4 +1,5 @@
 from .function import Function
+import numpy as np
 
 
 class SoftmaxCrossEntropy(Function):
@@ -7,3 +8,20 @@ class SoftmaxCrossEntropy(Function):
                            'cache_score'}
         optional_params = set()
         super(SoftmaxCrossEntropy, self).__init__(inputs, outputs, params, required_params, optional_params)
+
+    def run(self, x, t):
+        '''Mean cross-entropy of the scores ``x`` (classes on axis 1) against the labels ``t``.
+
+        Labels of -1 are ignored. The sum is divided by the number of the
+        other labels with ``normalize``, and by the batch size otherwise.
+        '''
+        t = np.asarray(t)
+        valid = t != -1
+        # log softmax(x)[t] = (x[t] - max) - log(sum(exp(x - max)))
+        R = np.subtract(x, np.max(x, axis=1, keepdims=True))
+        score = np.take_along_axis(R, np.expand_dims(np.where(valid, t, 0), 1), axis=1)[:, 0]
+        np.exp(R, out=R)
+        log_z = np.log(np.sum(R, axis=1))
+        loss = np.sum(log_z - score, where=valid)
+        count = np.count_nonzero(valid) if self.params['normalize'] else x.shape[0]
+        return np.asarray(loss / max(count, 1), dtype=R.dtype)
@@ -8,6 +8,5 @@ class Tanh(Function):
         optional_params = set()
         super(Tanh, self).__init__(inputs, outputs, params, required_params, optional_params)
 
-    def run(self, x):
-        R = x.copy()
-        return np.tanh(R)
+    def run(self, x, out=None):
+        return np.tanh(x, out=out)
@@ -18,9 +18,22 @@ class Unpooling2D(Function):
         super(Unpooling2D, self).__init__(inputs, outputs, params, required_params, optional_params)
 
     def run(self, x):
-        col = np.tile(x[:, :, None, None], (1, 1, self.params['kh'], self.params['kw'], 1, 1))
-        R = util.col2im_cpu(col, (self.params['sy'], self.params['sx']),
-                            self.params['ph'], self.params['pw'],
-                            self.params['outh'],
-                            self.params['outw'])
+        kh, kw = self.params['kh'], self.params['kw']
+        sy, sx = self.params['sy'], self.params['sx']
+        ph, pw = self.params['ph'], self.params['pw']
+        outh, outw = self.params['outh'], self.params['outw']
+        batch, ch, h, w = x.shape
+        if (sy, sx) == (kh, kw):
+            # windows do not overlap: every input pixel becomes a kh x kw block
+            full = np.empty((batch, ch, h, kh, w, kw), dtype=x.dtype)
+            full[...] = x[:, :, :, None, :, None]
+            full = full.reshape(batch, ch, h * kh, w * kw)
+            if (ph, pw, outh, outw) == (0, 0, h * kh, w * kw):
+                return full
+            R = np.zeros((batch, ch, outh, outw), dtype=x.dtype)
+            full = full[:, :, ph:ph + outh, pw:pw + outw]
+            R[:, :, :full.shape[2], :full.shape[3]] = full
+            return R
+        col = np.broadcast_to(x[:, :, None, None], (batch, ch, kh, kw, h, w))
+        R = util.col2im_cpu(col, (sy, sx), ph, pw, outh, outw)
         return R
@@ -7,6 +7,12 @@ def get_conv_outsize(size, k, s, pre_p, post_p, cover_all=False, d=1):
 
 
 def im2col_cpu(img, kernel, stride, ph, pw, dilate=(1, 1), pval=0, cover_all=False):
+    '''Return the padded image and its ``(n, c, kh, kw, out_h, out_w)`` columns.
+
+    The columns are a read-only strided view into the padded image, so no
+    memory proportional to the kernel size is allocated; callers reduce or
+    contract over the view directly.
+    '''
     n, c, h, w = img.shape
     kh, kw = kernel
     sy, sx = stride
@@ -18,18 +24,16 @@ def im2col_cpu(img, kernel, stride, ph, pw, dilate=(1, 1), pval=0, cover_all=Fal
     out_h = get_conv_outsize(h, kh, sy, pre_ph, post_ph, cover_all, dy)
     out_w = get_conv_outsize(w, kw, sx, pre_pw, post_pw, cover_all, dx)
 
-    img = np.pad(img,
-                 ((0, 0), (0, 0), (pre_ph, post_ph), (pre_pw, post_pw)),
-                 mode='constant', constant_values=(pval,))
-    col = np.ndarray((n, c, kh, kw, out_h, out_w), dtype=img.dtype)
-
-    for j in range(kh):
-        jdy = j * dy
-        j_lim = jdy + sy * out_h
-        for i in range(kw):
-            idx = i * dx
-            i_lim = idx + sx * out_w
-            col[:, :, j, i, :, :] = img[:, :, jdy:j_lim:sy, idx:i_lim:sx]
+    if pre_ph or post_ph or pre_pw or post_pw:
+        img = np.pad(img,
+                     ((0, 0), (0, 0), (pre_ph, post_ph), (pre_pw, post_pw)),
+                     mode='constant', constant_values=(pval,))
+    else:
+        img = np.asarray(img)
+    sn, sc, sh, sw = img.strides
+    col = np.lib.stride_tricks.as_strided(img, (n, c, kh, kw, out_h, out_w),
+                                          (sn, sc, sh * dy, sw * dx, sh * sy, sw * sx),
+                                          writeable=False)
 
     return img, col
 
@@ -46,3 +50,22 @@ def col2im_cpu(col, stride, ph, pw, h, w, dy=1, dx=1):
             i_lim = idx + sx * out_w
             img[:, :, jdy:j_lim:sy, idx:i_lim:sx] += col[:, :, j, i]
     return img[:, :, ph:h + ph, pw:w + pw]
+
+
+def reduce_windows(col, ufunc):
+    '''Reduce the ``(n, c, kh, kw, out_h, out_w)`` columns over the kernel axes with a binary ``ufunc``.
+
+    The kh * kw window slices are accumulated into one output array, so no
+    temporary proportional to the kernel size is created.
+    '''
+    n, c, kh, kw, out_h, out_w = col.shape
+    y = col[:, :, 0, 0].copy()
+    for j in range(kh):
+        for i in range(kw):
+            if j or i:
+                ufunc(y, col[:, :, j, i], out=y)
+    return y
+
+
+def is_global_pooling(x, kernel, pad_h, pad_w):
+    return tuple(kernel) == x.shape[2:] and not any(pad_h) and not any(pad_w)
@@ -0,0 +1,139 @@
+import mmap
+import numpy
+from . import npy
+from .nnoir import _check_version
+from .reader import Reader
+from .value import Value
+
+
+def inspect(nnoir_file):
+    '''Describe the model in ``nnoir_file`` without decoding its tensors.
+
+    Only the msgpack header is parsed; tensor shapes and dtypes come from the
+    ``.npy`` headers (v0) or the tensor index (v1).
+    '''
+    with open(nnoir_file, 'rb') as f:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    nnoir = Reader(buf).read()
+    version = nnoir[b'nnoir'][b'version']
+    _check_version(version)
+    tensors = nnoir[b'nnoir'].get(b'tensors', [])
+    models = nnoir[b'nnoir'].get(b'models', [])
+    return ModelInfo(nnoir[b'nnoir'][b'model'], tensors, models, version)
+
+
+class TensorInfo():
+    def __init__(self, shape, dtype, stored_nbytes, key):
+        self.shape = tuple(shape)
+        self.dtype = dtype
+        self.size = int(numpy.prod(self.shape))
+        self.nbytes = self.size * dtype.itemsize
+        self.stored_nbytes = stored_nbytes
+        self.key = key  # identifies the stored tensor when it is shared
+
+    def to_dict(self):
+        return {
+            'shape': list(self.shape),
+            'dtype': self.dtype.str,
+            'nbytes': self.nbytes,
+            'stored_nbytes': self.stored_nbytes
+        }
+
+
+class FunctionInfo():
+    def __init__(self, function, tensors, models):
+        self.name = function[b'name'].decode()
+        self.inputs = function[b'inputs']
+        self.outputs = function[b'outputs']
+        self.params = {}
+        for k, v in function[b'params'].items():
+            if type(v) is dict and b'ndarray' in v:
+                shape, _, dtype, offset = npy.read_header(v[b'ndarray'])
+                v = TensorInfo(shape, dtype, len(v[b'ndarray']), id(v))
+            elif type(v) is dict and b'tensor' in v:
+                t = tensors[v[b'tensor']]
+                v = TensorInfo(t[b'shape'], numpy.dtype(t[b'dtype'].decode()), t[b'length'], v[b'tensor'])
+            elif type(v) is dict and b'model' in v:
+                v = ModelInfo(models[v[b'model']], tensors, models)
+            elif type(v) is dict:
+                v = ModelInfo(v, tensors, models)
+            self.params[k.decode()] = v
+
+    def tensors(self):
+        for k, v in self.params.items():
+            if isinstance(v, TensorInfo):
+                yield k, v
+            elif isinstance(v, ModelInfo):
+                for f in v.functions:
+                    for k_, v_ in f.tensors():
+                        yield '{}.{}'.format(k, k_), v_
+
+    def to_dict(self):
+        def param(v):
+            if isinstance(v, (TensorInfo, ModelInfo)):
+                return v.to_dict()
+            elif type(v) is bytes:
+                return v.decode()
+            return v
+        return {
+            'name': self.name,
+            'inputs': [x.decode() for x in self.inputs],
+            'outputs': [x.decode() for x in self.outputs],
+            'params': {k: param(v) for k, v in self.params.items()}
+        }
+
+
+class ModelInfo():
+    def __init__(self, model, tensors, models, version=None):
+        self.version = version
+        self.name = model[b'name']
+        self.generator_name = model[b'generator'][b'name']
+        self.generator_version = model[b'generator'][b'version']
+        values = {v[b'name']: Value(v[b'name'], dtype=v[b'dtype'], shape=v[b'shape']) for v in model[b'values']}
+        self.values = list(values.values())
+        self.inputs = [values[x] for x in model[b'inputs']]
+        self.outputs = [values[x] for x in model[b'outputs']]
+        self.functions = [FunctionInfo(f, tensors, models) for f in model[b'functions']]
+
+    def tensors(self):
+        '''Yield ``(function index, function name, param name, TensorInfo)`` for every ndarray param.'''
+        for i, f in enumerate(self.functions):
+            for k, v in f.tensors():
+                yield i, f.name, k, v
+
+    def _unique_tensors(self):
+        unique = {}
+        for _, _, _, t in self.tensors():
+            unique[t.key] = t
+        return unique.values()
+
+    @property
+    def param_count(self):
+        return sum(t.size for t in self._unique_tensors())
+
+    @property
+    def param_nbytes(self):
+        return sum(t.nbytes for t in self._unique_tensors())
+
+    def largest_tensors(self, n=10):
+        return sorted(self.tensors(), key=lambda x: x[3].nbytes, reverse=True)[:n]
+
+    def to_dict(self):
+        def value(v):
+            return {'name': v.name.decode(), 'dtype': _str(v.dtype), 'shape': list(v.shape)}
+        result = {
+            'name': self.name.decode(),
+            'generator': {'name': _str(self.generator_name), 'version': _str(self.generator_version)},
+            'inputs': [value(v) for v in self.inputs],
+            'outputs': [value(v) for v in self.outputs],
+            'param_count': self.param_count,
+            'param_nbytes': self.param_nbytes,
+            'functions': [f.to_dict() for f in self.functions]
+        }
+        if self.version is not None:
+            result['version'] = self.version
+        return result
+
+
+def _str(x):
+    return x.decode() if type(x) is bytes else x
@@ -0,0 +1,111 @@
+import numpy
+from . import compression
+from . import npy
+
+
+class LazyNDArray(numpy.lib.mixins.NDArrayOperatorsMixin):
+    '''Proxy for an ndarray param that is decoded on first access.
+
+    ``buf`` holds the ``.npy`` image of the param, or raw array data described
+    by ``header`` (see ``npy.from_buffer``). ``shape``, ``dtype`` and
+    ``nbytes`` are answered from the header alone; any other use materializes
+    the array, which ``release()`` drops again. When ``copy`` is false the
+    materialized array is a view of ``buf`` rather than a copy. A tensor stored
+    compressed is described by its tensor table entry ``compressed`` and is
+    always decompressed into a private array.
+
+    Arithmetic operators, ufuncs and numpy functions materialize the array
+    and apply to it. Functions that prepare a layout of their params (see
+    ``Function._prepare``) keep that derived copy, which ``release()`` does
+    not free.
+    '''
+
+    def __init__(self, buf, header=None, copy=True, compressed=None):
+        self.buf = buf
+        self.is_npy = header is None
+        self._copy = copy and compressed is None
+        self._compressed = compressed
+        self._header = header
+        self._array = None
+
+    def _read_header(self):
+        if self._header is None:
+            self._header = npy.read_header(self.buf)
+        return self._header
+
+    @property
+    def shape(self):
+        return self._read_header()[0]
+
+    @property
+    def dtype(self):
+        return self._read_header()[2]
+
+    @property
+    def ndim(self):
+        return len(self.shape)
+
+    @property
+    def size(self):
+        size = 1
+        for n in self.shape:
+            size *= n
+        return size
+
+    @property
+    def nbytes(self):
+        return self.size * self.dtype.itemsize
+
+    @property
+    def materialized(self):
+        return self._array is not None
+
+    def decode(self):
+        '''Return the tensor without caching it, as a view of ``buf`` if possible.'''
+        if self._compressed is not None:
+            return compression.decompress(self.buf, self._compressed)
+        return npy.from_buffer(self.buf, self._read_header())
+
+    def materialize(self):
+        if self._array is None:
+            array = self.decode()
+            self._array = array.copy() if self._copy else array
+        return self._array
+
+    def release(self):
+        self._array = None
+
+    def __array__(self, dtype=None, copy=None):
+        array = self.materialize()
+        if dtype is not None and dtype != array.dtype:
+            return array.astype(dtype)
+        return array.copy() if copy else array
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        inputs = _materialize(inputs)
+        if 'out' in kwargs:
+            kwargs['out'] = _materialize(kwargs['out'])
+        return getattr(ufunc, method)(*inputs, **kwargs)
+
+    def __array_function__(self, func, types, args, kwargs):
+        return func(*_materialize(args), **kwargs)
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return getattr(self.materialize(), name)
+
+    def __getitem__(self, key):
+        return self.materialize()[key]
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __repr__(self):
+        return 'LazyNDArray(shape={}, dtype={})'.format(self.shape, self.dtype)
+
+
+def _materialize(args):
+    # args with every LazyNDArray, also inside lists and tuples, materialized
+    return type(args)(a.materialize() if type(a) is LazyNDArray else
+                      _materialize(a) if type(a) in (list, tuple) else a for a in args)
@@ -1,31 +1,180 @@
-import io
+import functools
+import mmap as mmap_module
+import time
+from concurrent.futures import ThreadPoolExecutor
 import msgpack
 import numpy
-from .nnoir import NNOIR
+from . import compression
+from . import npy
+from .lazy import LazyNDArray
+from .nnoir import NNOIR, InvalidNNOIRData, _check_version
 from .functions import *
+from .reader import Reader
 from .value import Value
+from .writer import align
 
 
-def load(nnoir_file):
-    with open(nnoir_file, 'rb') as f:
-        nnoir = msgpack.unpackb(f.read())
-    name = nnoir[b'nnoir'][b'model'][b'name']
-    generator_name = nnoir[b'nnoir'][b'model'][b'generator'][b'name']
-    generator_version = nnoir[b'nnoir'][b'model'][b'generator'][b'version']
-    inputs = nnoir[b'nnoir'][b'model'][b'inputs']
-    outputs = nnoir[b'nnoir'][b'model'][b'outputs']
-    vs = [_decode_value(v) for v in nnoir[b'nnoir'][b'model'][b'values']]
-    fs = [_decode_function(f) for f in nnoir[b'nnoir'][b'model'][b'functions']]
+def load(nnoir_file, mmap=False, lazy=False, workers=None, timings=None):
+    '''Load a NNOIR model from ``nnoir_file``.
+
+    Both the v0 container and the v1 container (raw tensor section behind
+    the msgpack header) are accepted.
+
+    With ``mmap=True`` the file is memory-mapped and ndarray params are
+    read-only views into the mapping instead of private copies, so loading
+    does not depend on the size of the weights and processes loading the
+    same file share its pages.
+
+    With ``lazy=True`` the file is memory-mapped as well, but ndarray params
+    are ``LazyNDArray`` proxies that decode their tensor on first access, so
+    loading costs time proportional to the graph only.
+
+    Otherwise all ndarray params are decoded and validated before any
+    ``Function`` is built, one after another unless ``workers`` is greater
+    than 1, in which case they are decoded concurrently in a thread pool of
+    ``workers`` threads. If ``timings`` is
+    a dict, the seconds spent in each phase are stored in it under
+    ``'unpack'``, ``'decode'`` and ``'construct'``.
+    '''
+    start = time.perf_counter()
+    if lazy or mmap:
+        nnoir, data = _map(nnoir_file)
+    else:
+        nnoir, data = _read(nnoir_file)
+    _check_version(nnoir[b'nnoir'][b'version'])
+    unpacked = time.perf_counter()
+    entries = nnoir[b'nnoir'].get(b'tensors', [])
+    models = nnoir[b'nnoir'].get(b'models', [])
+    if lazy:
+        arrays = {}
+        tensors = [LazyNDArray(data, _tensor_header(t), copy=not mmap,
+                               compressed=t if b'compression' in t else None) for t in entries]
+    else:
+        arrays, tensors = _decode_tensors(nnoir, data, mmap, workers)
+    decoded = time.perf_counter()
+    # params referring to the same table entry share one decoded object
+    decoded_models = {}
+
+    def decode_param(param):
+        if b'ndarray' in param and lazy:
+            return LazyNDArray(param[b'ndarray'], copy=not mmap)
+        elif b'ndarray' in param:
+            return arrays[id(param)]
+        elif b'tensor' in param:
+            return tensors[param[b'tensor']]
+        elif b'model' in param:
+            i = param[b'model']
+            if i not in decoded_models:
+                decoded_models[i] = _decode_model(models[i], decode_param)
+            return decoded_models[i]
+        else:
+            return _decode_model(param, decode_param)
+    model = _decode_model(nnoir[b'nnoir'][b'model'], decode_param)
+    if timings is not None:
+        timings['unpack'] = unpacked - start
+        timings['decode'] = decoded - unpacked
+        timings['construct'] = time.perf_counter() - decoded
+    return model
+
+
+def _decode_model(model, decode_param):
+    name = model[b'name']
+    generator_name = model[b'generator'][b'name']
+    generator_version = model[b'generator'][b'version']
+    inputs = model[b'inputs']
+    outputs = model[b'outputs']
+    vs = [_decode_value(v) for v in model[b'values']]
+    fs = [_decode_function(f, decode_param) for f in model[b'functions']]
     return NNOIR(name, generator_name, generator_version, inputs, outputs, vs, fs)
 
 
-def _decode_function(function):
+def _read(nnoir_file):
+    with open(nnoir_file, 'rb') as f:
+        buf = f.read()
+    try:
+        return msgpack.unpackb(buf), memoryview(b'')
+    except msgpack.ExtraData as e:
+        # v1: the tensor section follows the header at the next aligned offset
+        header_size = len(buf) - len(e.extra)
+        return e.unpacked, memoryview(e.extra)[align(header_size) - header_size:]
+
+
+def _map(nnoir_file):
+    with open(nnoir_file, 'rb') as f:
+        buf = mmap_module.mmap(f.fileno(), 0, access=mmap_module.ACCESS_READ)
+    reader = Reader(buf)
+    nnoir = reader.read()
+    return nnoir, reader.buf[align(reader.pos):]
+
+
+def _decode_tensors(nnoir, data, mmap, workers):
+    # decode the embedded .npy params (keyed by the id of their param dict)
+    # and the tensor section (keyed by index) as independent jobs; the chunks
+    # of compressed tensors are separate jobs too. Headers are parsed here
+    # rather than in the jobs, as parsing them is not safe to run in threads.
+    arrays = {}
+    tensors = {}
+    jobs = []
+
+    def decode_blob(param, header):
+        array = npy.from_buffer(param[b'ndarray'], header)
+        arrays[id(param)] = array if mmap else array.copy()
+
+    def decode_tensor(i, header):
+        # without mmap, data is a private buffer that the arrays may share
+        tensors[i] = npy.from_buffer(data, header)
+    for param in _ndarray_params(nnoir):
+        jobs.append(functools.partial(decode_blob, param, npy.read_header(param[b'ndarray'])))
+    for i, entry in enumerate(nnoir[b'nnoir'].get(b'tensors', [])):
+        _validate_tensor(i, entry, data)
+        if b'compression' in entry:
+            tensors[i], tensor_jobs = compression.decompressor(data, entry)
+            jobs += tensor_jobs
+        else:
+            jobs.append(functools.partial(decode_tensor, i, _tensor_header(entry)))
+    if workers is None or workers <= 1 or len(jobs) < 2:
+        for job in jobs:
+            job()
+    else:
+        with ThreadPoolExecutor(workers) as executor:
+            for future in [executor.submit(job) for job in jobs]:
+                future.result()
+    return arrays, [tensors[i] for i in range(len(tensors))]
+
+
+def _ndarray_params(obj):
+    if type(obj) is dict and b'ndarray' in obj:
+        yield obj
+    elif type(obj) is dict:
+        for v in obj.values():
+            yield from _ndarray_params(v)
+    elif type(obj) is list:
+        for v in obj:
+            yield from _ndarray_params(v)
+
+
+def _validate_tensor(i, entry, data):
+    if entry[b'offset'] + entry[b'length'] > len(data):
+        raise InvalidNNOIRData('tensor {} lies outside of the tensor section'.format(i))
+    shape, _, dtype, _ = _tensor_header(entry)
+    size = dtype.itemsize
+    for n in shape:
+        size *= n
+    if b'compression' not in entry and entry[b'length'] != size:
+        raise InvalidNNOIRData('length of tensor {} does not match its dtype and shape'.format(i))
+
+
+def _tensor_header(tensor):
+    return tuple(tensor[b'shape']), False, numpy.dtype(tensor[b'dtype'].decode()), tensor[b'offset']
+
+
+def _decode_function(function, decode_param):
     inputs = function[b'inputs']
     outputs = function[b'outputs']
     params = {}
     for k, v in function[b'params'].items():
         if type(v) is dict:
-            params[k.decode()] = numpy.load(io.BytesIO(v[b'ndarray']))
+            params[k.decode()] = decode_param(v)
         else:
             params[k.decode()] = v
     name = function[b'name'].decode()
@@ -0,0 +1,88 @@
+import numpy
+
+
+def lifetimes(schedule, inputs=(), outputs=()):
+    '''Return ``{name: (first, last)}`` schedule steps during which each value is alive.
+
+    A value is alive from the step producing it (``-1`` for inputs) to its
+    last consumer; outputs stay alive until the end of the schedule.
+    '''
+    result = {name: (-1, -1) for name in inputs}
+    for step, function in enumerate(schedule):
+        for name in function.inputs:
+            first, _ = result[name]
+            result[name] = (first, step)
+        for name in function.outputs:
+            result[name] = (step, step)
+    for name in outputs:
+        result[name] = (result[name][0], len(schedule))
+    return result
+
+
+class MemoryPlan():
+    '''Static placement of the intermediate values of a schedule in one arena.
+
+    Intermediates are the values that are neither inputs nor outputs of the
+    model. Their sizes come from the ``shape`` and ``dtype`` of their
+    ``Value``; two of them may share memory when their lifetimes do not
+    overlap. Offsets are assigned greedily, largest value first, at the
+    lowest ``alignment``-aligned position that is free for its lifetime.
+    '''
+
+    def __init__(self, model, schedule, alignment=64):
+        self.alignment = alignment
+        values = {v.name: v for v in model.values}
+        self.lifetimes = lifetimes(schedule, model.inputs, model.outputs)
+        self.sizes = {}
+        for function in schedule:
+            for name in function.outputs:
+                if name not in model.outputs:
+                    self.sizes[name] = _nbytes(values[name])
+        self.offsets = {}
+        placed = []
+        for name in sorted(self.sizes, key=lambda n: (-self.sizes[n], self.lifetimes[n])):
+            first, last = self.lifetimes[name]
+            conflicts = sorted((offset, size) for offset, size, (f, l) in placed if f <= last and first <= l)
+            offset = 0
+            for o, size in conflicts:
+                if offset + self.sizes[name] <= o:
+                    break
+                offset = max(offset, self._align(o + size))
+            self.offsets[name] = offset
+            placed.append((offset, self.sizes[name], (first, last)))
+        self.arena_size = max([self.offsets[n] + self.sizes[n] for n in self.sizes] + [0])
+        self.naive_size = sum(self.sizes.values())
+        live = [0] * (len(schedule) + 1)
+        for name, size in self.sizes.items():
+            first, last = self.lifetimes[name]
+            live[first] += size
+            live[last + 1] -= size
+        self.peak = int(max(numpy.cumsum(live))) if self.sizes else 0
+
+    def _align(self, n):
+        return (n + self.alignment - 1) // self.alignment * self.alignment
+
+    def allocate(self):
+        '''Return a new arena large enough for the plan.'''
+        return numpy.empty(self.arena_size, dtype=numpy.uint8)
+
+    def buffer(self, arena, value):
+        '''Return the slot of ``value`` in ``arena`` as an array of its dtype and shape.'''
+        offset = self.offsets[value.name]
+        dtype = _dtype(value)
+        return arena[offset:offset + self.sizes[value.name]].view(dtype).reshape(tuple(value.shape))
+
+    def report(self):
+        return ('intermediates: {} values, naive: {} bytes, live peak: {} bytes, arena: {} bytes'
+                .format(len(self.sizes), self.naive_size, self.peak, self.arena_size))
+
+
+def _dtype(value):
+    return numpy.dtype(value.dtype.decode() if type(value.dtype) is bytes else value.dtype)
+
+
+def _nbytes(value):
+    size = _dtype(value).itemsize
+    for n in value.shape:
+        size *= n
+    return size
@@ -1,5 +1,7 @@
+import io
 import msgpack
 import re
+from .writer import NDArray, TensorTable, Writer
 
 
 class InvalidNNOIRData(Exception):
@@ -8,6 +10,13 @@ class InvalidNNOIRData(Exception):
         self.message = message
 
 
+def _check_version(version, compression=None):
+    if version not in (0, 1):
+        raise InvalidNNOIRData('unsupported NNOIR version: {}'.format(version))
+    if compression is not None and version == 0:
+        raise InvalidNNOIRData('compression requires NNOIR version 1')
+
+
 class NNOIR():
 
     def __init__(self, name, generator_name, generator_version, inputs, outputs, values, functions):
@@ -43,7 +52,7 @@ class NNOIR():
             if not vident.match(v.name) or v.name.decode() in c_keywords:
                 raise InvalidNNOIRData('value name "{}" MUST be "v" prefixed C identifier.'.format(v.name))
 
-    def to_model(self):
+    def to_model(self, encode_ndarray=None, encode_model=None):
         return {
             b'name': self.name,
             b'generator':
@@ -52,21 +61,61 @@ class NNOIR():
             b'inputs': self.inputs,
             b'outputs': self.outputs,
             b'values': [v.dump() for v in self.values],
-            b'functions': [f.dump() for f in self.functions]
+            b'functions': [f.dump(encode_ndarray, encode_model) for f in self.functions]
         }
 
-    def to_nnoir(self):
+    def to_nnoir(self, encode_ndarray=None, version=0):
+        _check_version(version)
+        if version == 1:
+            return self._to_nnoir_v1()[0]
         return {
             b'nnoir':
             {b'version': 0,
-             b'model': self.to_model()
+             b'model': self.to_model(encode_ndarray)
              }
         }
 
-    def pack(self):
-        return msgpack.packb(self.to_nnoir())
+    def _to_nnoir_v1(self, compression=None, shuffle=False):
+        # v1 keeps the graph in a small msgpack header and moves every ndarray
+        # param to an aligned raw tensor section indexed by b'tensors';
+        # identical tensors and sub-models are stored only once
+        if isinstance(compression, str):
+            compression = compression.encode()
+        tensors = TensorTable(compression, shuffle)
+        header = {
+            b'nnoir':
+            {b'version': 1,
+             b'model': self.to_model(tensors.add, tensors.add_model),
+             b'tensors': tensors.entries,
+             b'models': tensors.models
+             }
+        }
+        return header, tensors
+
+    def pack(self, version=0, compression=None, shuffle=False):
+        _check_version(version, compression)
+        if version == 0:
+            return msgpack.packb(self.to_nnoir())
+        header, tensors = self._to_nnoir_v1(compression, shuffle)
+        with io.BytesIO() as out:
+            out.write(msgpack.packb(header))
+            tensors.write(out, out.tell())
+            return out.getvalue()
+
+    def dump(self, file_name, version=0, compression=None, shuffle=False):
+        '''Write the model to ``file_name``.
 
-    def dump(self, file_name):
-        result = self.pack()
-        with open(file_name, 'w') as f:
-            f.buffer.write(result)
+        ``compression`` (``'zlib'`` or ``'lzma'``, version 1 only) stores each
+        tensor as chunks compressed with that codec; ``shuffle`` additionally
+        byte-shuffles float tensors, which usually compresses them better.
+        '''
+        _check_version(version, compression)
+        if version == 0:
+            # stream the container so that no packed copy of the weights is built
+            with open(file_name, 'wb') as f:
+                Writer(f).write(self.to_nnoir(lambda x: {b'ndarray': NDArray(x)}))
+            return
+        header, tensors = self._to_nnoir_v1(compression, shuffle)
+        with open(file_name, 'wb') as f:
+            f.write(msgpack.packb(header))
+            tensors.write(f, f.tell())
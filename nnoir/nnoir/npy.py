@@ -0,0 +1,44 @@
+import io
+import struct
+import numpy
+
+
+def read_header(buf):
+    """Parse the header of a ``.npy`` image held in ``buf``.
+
+    Returns ``(shape, fortran_order, dtype, offset)`` where ``offset`` is the
+    position of the first data byte. Only the header bytes are touched.
+    """
+    major = buf[6]
+    if major == 1:
+        size, = struct.unpack_from('<H', buf, 8)
+        end = 10 + size
+    else:
+        size, = struct.unpack_from('<I', buf, 8)
+        end = 12 + size
+    fp = io.BytesIO(bytes(buf[:end]))
+    version = numpy.lib.format.read_magic(fp)
+    if version == (1, 0):
+        shape, fortran_order, dtype = numpy.lib.format.read_array_header_1_0(fp)
+    else:
+        shape, fortran_order, dtype = numpy.lib.format.read_array_header_2_0(fp)
+    return shape, fortran_order, dtype, end
+
+
+def from_buffer(buf, header=None):
+    """Return a ``numpy.ndarray`` sharing memory with the ``.npy`` image in ``buf``.
+
+    ``header`` may be given as ``(shape, fortran_order, dtype, offset)`` to
+    read raw array data that has no ``.npy`` header of its own. The array is
+    read-only whenever ``buf`` is (e.g. a view of an ``mmap``).
+    """
+    if header is None:
+        header = read_header(buf)
+    shape, fortran_order, dtype, offset = header
+    if dtype.hasobject:
+        raise ValueError('object arrays can not be read from a buffer')
+    count = 1
+    for n in shape:
+        count *= n
+    array = numpy.frombuffer(buf, dtype=dtype, count=count, offset=offset)
+    return array.reshape(shape, order='F' if fortran_order else 'C')
@@ -0,0 +1,5 @@
+from .fold import fold_affine
+from .eliminate import eliminate, eliminate_identities, prune, renumber
+from .padding import fold_padding
+from .layout import simplify_layout
+from .constant import fold_constants
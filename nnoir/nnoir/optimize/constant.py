@@ -0,0 +1,55 @@
+import numpy as np
+from ..functions import BroadcastTo, Constant
+from ..memory import _dtype, _nbytes
+from ..runtime import schedule
+from . import util
+
+
+def fold_constants(model, max_bytes=1 << 20):
+    '''Evaluate the functions computed from ``Constant`` values only.
+
+    Every function whose inputs are all produced by ``Constant`` functions
+    (or by functions folded before it) is run once with its ``run()`` and
+    replaced by a ``Constant`` holding its result. Results larger than
+    ``max_bytes`` are not folded, so that the model does not grow by huge
+    constants. ``Constant`` functions left without consumers are removed.
+    '''
+    values = {v.name: v for v in model.values}
+    constants = {}
+    folded = {}
+    for function in schedule(model):
+        if isinstance(function, Constant):
+            constants[function.outputs[0]] = util.array(function.params['value'])
+            continue
+        if not function.inputs or any(name not in constants for name in function.inputs):
+            continue
+        if any(_nbytes(values[name]) > max_bytes for name in function.outputs):
+            continue
+        args = [constants[name] for name in function.inputs]
+        if isinstance(function, BroadcastTo):
+            args.append(tuple(values[function.outputs[0]].shape))
+        ys = function.run(*args)
+        if len(function.outputs) == 1:
+            ys = (ys,)
+        results = []
+        for name, y in zip(function.outputs, ys):
+            y = np.ascontiguousarray(y, dtype=_dtype(values[name]))
+            constants[name] = y
+            results.append(Constant([], [name], value=y))
+        folded[id(function)] = results
+    functions = []
+    for function in model.functions:
+        functions += folded.get(id(function), [function])
+    return _drop_unused_constants(util.rebuild(model, functions))
+
+
+def _drop_unused_constants(model):
+    functions = list(model.functions)
+    while True:
+        used = set(model.outputs)
+        for function in functions:
+            used.update(function.inputs)
+        unused = [f for f in functions if isinstance(f, Constant) and f.outputs[0] not in used]
+        if not unused:
+            return util.rebuild(model, functions)
+        functions = [f for f in functions if not any(f is u for u in unused)]
@@ -0,0 +1,103 @@
+from ..functions import AddConstant, BroadcastTo, Concat, ConstantPadding, Dropout, MulConstant, Reshape, Transpose
+from ..nnoir import NNOIR
+from ..runtime import schedule
+from ..value import Value
+from . import util
+
+
+def eliminate(model, report=None):
+    '''Remove identities and unreachable functions, then renumber the values.
+
+    If ``report`` is a dict, the number of functions and values and the bytes
+    of params and values removed are stored in it (see ``util.size``).
+    '''
+    before = util.size(model)
+    model = renumber(prune(eliminate_identities(model)))
+    if report is not None:
+        after = util.size(model)
+        report.update({k: before[k] - after[k] for k in before})
+    return model
+
+
+def eliminate_identities(model, types=None):
+    '''Remove the functions whose output always equals their input.
+
+    These are ``Dropout``, and ``Reshape``, ``Transpose``, ``BroadcastTo``,
+    ``ConstantPadding``, ``Concat``, ``MulConstant`` and ``AddConstant`` when
+    their params make them a no-op. If ``types`` is given, only instances of
+    those classes are removed. An identity between a model input and a model
+    output is kept.
+    '''
+    values = {v.name: v for v in model.values}
+    functions = list(model.functions)
+    i = 0
+    while i < len(functions):
+        function = functions[i]
+        if types is not None and not isinstance(function, types) or not _is_identity(function, values):
+            i += 1
+            continue
+        x, y = function.inputs[0], function.outputs[0]
+        if y not in model.outputs:
+            names = {y: x}
+        elif x not in model.inputs and x not in model.outputs:
+            names = {x: y}
+        else:
+            i += 1
+            continue
+        del functions[i]
+        functions = [util.rename(f, names) for f in functions]
+        i = 0
+    return util.rebuild(model, functions)
+
+
+def _is_identity(function, values):
+    if len(function.inputs) != 1 or len(function.outputs) != 1:
+        return False
+    x = values[function.inputs[0]]
+    y = values[function.outputs[0]]
+    if tuple(x.shape) != tuple(y.shape) or x.dtype != y.dtype:
+        return False
+    if isinstance(function, (Dropout, Reshape, BroadcastTo, Concat)):
+        return True
+    elif isinstance(function, Transpose):
+        return list(function.params['axes']) == list(range(len(x.shape)))
+    elif isinstance(function, ConstantPadding):
+        return not any(p for pad in function.params['pads'] for p in pad)
+    elif isinstance(function, MulConstant):
+        return function.params['value'] == 1
+    elif isinstance(function, AddConstant):
+        return function.params['value'] == 0
+    return False
+
+
+def prune(model):
+    '''Remove the functions that do not contribute to any model output, and their values.'''
+    needed = set(model.outputs)
+    kept = set()
+    for function in reversed(schedule(model)):
+        if any(name in needed for name in function.outputs):
+            kept.add(id(function))
+            needed.update(function.inputs)
+    return util.rebuild(model, [f for f in model.functions if id(f) in kept])
+
+
+def renumber(model):
+    '''Rename the intermediate values ``v0``, ``v1``, ... in the order of the functions.
+
+    The names of the model inputs and outputs are kept.
+    '''
+    reserved = set(model.inputs) | set(model.outputs)
+    names = {}
+    n = 0
+    for function in model.functions:
+        for name in list(function.inputs) + list(function.outputs):
+            if name in reserved or name in names:
+                continue
+            while 'v{}'.format(n).encode() in reserved:
+                n += 1
+            names[name] = 'v{}'.format(n).encode()
+            n += 1
+    functions = [util.rename(f, names) for f in model.functions]
+    values = [Value(names.get(v.name, v.name), dtype=v.dtype, shape=v.shape) for v in model.values]
+    return NNOIR(model.name, model.generator_name, model.generator_version, model.inputs, model.outputs,
+                 values, functions)
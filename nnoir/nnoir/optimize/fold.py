@@ -0,0 +1,92 @@
+import numpy as np
+from ..functions import AddConstant, BatchNormalization, Bias, Convolution2D, DepthwiseConvolution2D, Linear, \
+    MulConstant, Scale
+from . import util
+
+
+def fold_affine(model):
+    '''Fold per-channel affine functions into the preceding ``Convolution2D``, ``DepthwiseConvolution2D`` or ``Linear``.
+
+    ``BatchNormalization``, channel-wise ``Scale`` and ``Bias``,
+    ``MulConstant`` and ``AddConstant`` are merged into ``W`` and ``b`` of
+    their producer when it has no other consumer and its output is not a
+    model output. Returns a new model; ``model`` is left unchanged.
+    '''
+    values = {v.name: v for v in model.values}
+    functions = list(model.functions)
+    changed = True
+    while changed:
+        changed = False
+        current = util.rebuild(model, functions)
+        producers = util.producers(current)
+        consumers = util.consumers(current)
+        for i, function in enumerate(functions):
+            if len(function.inputs) != 1 or function.inputs[0] not in producers:
+                continue
+            name = function.inputs[0]
+            j = producers[name]
+            producer = functions[j]
+            if not isinstance(producer, (Convolution2D, DepthwiseConvolution2D, Linear)) or \
+                    len(consumers[name]) != 1 or name in model.outputs:
+                continue
+            W = util.array(producer.params['W'])
+            channels = W.shape[0] * W.shape[1] if isinstance(producer, DepthwiseConvolution2D) else W.shape[0]
+            affine = _affine(function, len(values[name].shape), channels)
+            if affine is None:
+                continue
+            W, b = _fold(producer, W, *affine)
+            functions[j] = util.replace(producer, outputs=function.outputs, W=W, b=b)
+            del functions[i]
+            changed = True
+            break
+    return util.rebuild(model, functions)
+
+
+def _affine(function, ndim, channels):
+    # (scale, shift) per output channel, or None if function is not a
+    # channel-wise affine transformation
+    if isinstance(function, BatchNormalization):
+        p = {k: util.array(function.params[k]).astype(np.float64) for k in ('gamma', 'beta', 'avg_mean', 'avg_var')}
+        if any(v.shape != (channels,) for v in p.values()):
+            return None
+        scale = p['gamma'] / np.sqrt(p['avg_var'] + function.params['eps'])
+        return scale, p['beta'] - p['avg_mean'] * scale
+    elif isinstance(function, Scale):
+        scale = _channelwise(util.array(function.params['W']), function.params['axis'], ndim, channels)
+        shift = _channelwise(util.array(function.params['b']), function.params['axis'], ndim, channels)
+        if scale is None or (shift is None and function.params['b'] is not None):
+            return None
+        return scale, np.zeros(channels) if shift is None else shift
+    elif isinstance(function, Bias):
+        shift = _channelwise(util.array(function.params['b']), function.params['axis'], ndim, channels)
+        return None if shift is None else (np.ones(channels), shift)
+    elif isinstance(function, MulConstant):
+        return np.full(channels, float(function.params['value'])), np.zeros(channels)
+    elif isinstance(function, AddConstant):
+        return np.ones(channels), np.full(channels, float(function.params['value']))
+    return None
+
+
+def _channelwise(param, axis, ndim, channels):
+    # the values of a Scale/Bias param along the channel axis 1, if it is
+    # constant along every other axis
+    if param is None:
+        return None
+    shape = (1,) * axis + param.shape + (1,) * (ndim - axis - param.ndim)
+    if len(shape) != ndim or ndim < 2 or any(n != 1 for k, n in enumerate(shape) if k != 1) or \
+            shape[1] not in (1, channels):
+        return None
+    return np.broadcast_to(param.reshape(-1).astype(np.float64), (channels,))
+
+
+def _fold(producer, W, scale, shift):
+    b = util.array(producer.params['b'])
+    dtype = W.dtype
+    if isinstance(producer, DepthwiseConvolution2D):
+        # output channel c * D + d is computed from W[d, c]
+        D, C = W.shape[:2]
+        W = W * scale.reshape(C, D).T[:, :, None, None]
+    else:
+        W = W * scale.reshape((-1,) + (1,) * (W.ndim - 1))
+    b = shift if b is None else b * scale + shift
+    return W.astype(dtype), b.astype(dtype)
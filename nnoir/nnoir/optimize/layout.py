@@ -0,0 +1,69 @@
+import numpy as np
+from ..functions import Linear, Reshape, Transpose
+from .eliminate import eliminate_identities
+from . import util
+
+
+def simplify_layout(model):
+    '''Remove copy-only ``Transpose`` and ``Reshape`` functions.
+
+    Consecutive transpositions are composed into one, consecutive reshapes
+    are merged, and a ``Transpose`` that keeps the batch axis followed by a
+    flattening ``Reshape`` into a ``Linear`` is replaced by permuting the
+    columns of ``W``. Transpositions and reshapes left without effect are
+    removed; other no-ops are left to ``eliminate()``. Only values that have a single consumer and are not model
+    outputs are rewritten away.
+    '''
+    values = {v.name: v for v in model.values}
+    functions = list(model.functions)
+    changed = True
+    while changed:
+        changed = False
+        current = util.rebuild(model, functions)
+        producers = util.producers(current)
+        consumers = util.consumers(current)
+
+        def single_use(name):
+            return name in producers and len(consumers[name]) == 1 and name not in model.outputs
+        for i, function in enumerate(functions):
+            if not isinstance(function, (Transpose, Reshape, Linear)) or not single_use(function.inputs[0]):
+                continue
+            j = producers[function.inputs[0]]
+            producer = functions[j]
+            if isinstance(function, Transpose) and isinstance(producer, Transpose):
+                # x.transpose(a).transpose(b) == x.transpose(a[b])
+                axes = [producer.params['axes'][k] for k in function.params['axes']]
+                functions[i] = util.replace(function, inputs=producer.inputs, axes=tuple(axes))
+            elif isinstance(function, Reshape) and isinstance(producer, Reshape):
+                functions[i] = util.replace(function, inputs=producer.inputs)
+            elif isinstance(function, Linear) and isinstance(producer, Reshape) and single_use(producer.inputs[0]) and \
+                    isinstance(functions[producers[producer.inputs[0]]], Transpose):
+                k = producers[producer.inputs[0]]
+                transpose = functions[k]
+                W = _permute_columns(function, transpose, values)
+                if W is None:
+                    continue
+                functions[j] = util.replace(producer, inputs=transpose.inputs)
+                functions[i] = util.replace(function, W=W)
+                j = k
+            else:
+                continue
+            del functions[j]
+            changed = True
+            break
+    return eliminate_identities(util.rebuild(model, functions), (Transpose, Reshape))
+
+
+def _permute_columns(linear, transpose, values):
+    # W of a Linear reading the flattened input of transpose rather than the
+    # flattened output, if transpose keeps the batch axis and the Linear
+    # input is (batch, features)
+    axes = list(transpose.params['axes'])
+    x_shape = tuple(values[transpose.inputs[0]].shape)
+    y_shape = tuple(values[linear.inputs[0]].shape)
+    if axes[0] != 0 or len(y_shape) != 2 or y_shape != (x_shape[0], int(np.prod(x_shape[1:]))):
+        return None
+    W = util.array(linear.params['W'])
+    transposed = [x_shape[a] for a in axes[1:]]
+    W = W.reshape([W.shape[0]] + transposed).transpose(np.argsort(axes))
+    return np.ascontiguousarray(W.reshape(W.shape[0], -1))
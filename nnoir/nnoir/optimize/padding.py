@@ -0,0 +1,51 @@
+import math
+from ..functions import AveragePooling2D, ConstantPadding, Convolution2D, DepthwiseConvolution2D, MaxPooling2D
+from . import util
+
+
+def fold_padding(model):
+    '''Merge ``ConstantPadding`` of the spatial axes into the pad params of the following function.
+
+    Zero padding is merged into ``Convolution2D``, ``DepthwiseConvolution2D``
+    and ``AveragePooling2D`` (without ``count_exclude_pad``), ``-inf``
+    padding into ``MaxPooling2D``. The padding must have no other consumer
+    and its output must not be a model output.
+    '''
+    functions = list(model.functions)
+    current = model
+    changed = True
+    while changed:
+        changed = False
+        producers = util.producers(current)
+        consumers = util.consumers(current)
+        for i, function in enumerate(functions):
+            if not isinstance(function, (Convolution2D, DepthwiseConvolution2D, AveragePooling2D, MaxPooling2D)):
+                continue
+            name = function.inputs[0]
+            if name not in producers or len(consumers[name]) != 1 or name in model.outputs:
+                continue
+            j = producers[name]
+            padding = functions[j]
+            if not isinstance(padding, ConstantPadding) or not _foldable(padding, function):
+                continue
+            pads = [tuple(pad) for pad in padding.params['pads']]
+            pad_h = tuple(a + b for a, b in zip(function.params['pad_h'], pads[2]))
+            pad_w = tuple(a + b for a, b in zip(function.params['pad_w'], pads[3]))
+            functions[i] = util.replace(function, inputs=padding.inputs, pad_h=pad_h, pad_w=pad_w)
+            del functions[j]
+            current = util.rebuild(model, functions)
+            changed = True
+            break
+    return util.rebuild(model, functions)
+
+
+def _foldable(padding, function):
+    pads = [tuple(pad) for pad in padding.params['pads']]
+    if len(pads) != 4 or any(pads[0]) or any(pads[1]) or any(p < 0 for pad in pads for p in pad):
+        return False
+    value = padding.params['value']
+    if isinstance(function, MaxPooling2D):
+        return math.isinf(value) and value < 0
+    if isinstance(function, AveragePooling2D) and function.params['count_exclude_pad']:
+        return False
+    return value == 0
@@ -0,0 +1,74 @@
+import io
+import numpy as np
+from ..nnoir import NNOIR
+from ..lazy import LazyNDArray
+from ..memory import _nbytes
+
+
+def array(param):
+    '''Return an ndarray param (ndarray, ``LazyNDArray`` or encoded ``{b'ndarray': ...}`` dict) as an ndarray.'''
+    if type(param) is dict and b'ndarray' in param:
+        return np.load(io.BytesIO(param[b'ndarray']))
+    if type(param) is LazyNDArray:
+        return np.asarray(param)
+    return param
+
+
+def consumers(model):
+    '''Map every value name to the indices of the functions of ``model`` using it.'''
+    result = {}
+    for i, function in enumerate(model.functions):
+        for name in function.inputs:
+            result.setdefault(name, []).append(i)
+    return result
+
+
+def producers(model):
+    '''Map every value name to the index of the function of ``model`` computing it.'''
+    return {name: i for i, function in enumerate(model.functions) for name in function.outputs}
+
+
+def replace(function, inputs=None, outputs=None, **params):
+    '''Return a copy of ``function`` with other inputs, outputs or params.'''
+    new_params = dict(function.params)
+    new_params.update(params)
+    return type(function)(function.inputs if inputs is None else inputs,
+                          function.outputs if outputs is None else outputs,
+                          **new_params)
+
+
+def rebuild(model, functions):
+    '''Return ``model`` with ``functions``, keeping only the values still in use.'''
+    used = set(model.inputs) | set(model.outputs)
+    for function in functions:
+        used.update(function.inputs)
+        used.update(function.outputs)
+    values = [v for v in model.values if v.name in used]
+    return NNOIR(model.name, model.generator_name, model.generator_version,
+                 model.inputs, model.outputs, values, functions)
+
+
+def rename(function, names):
+    '''Return ``function`` with its inputs and outputs renamed through the dict ``names``.'''
+    inputs = [names.get(name, name) for name in function.inputs]
+    outputs = [names.get(name, name) for name in function.outputs]
+    if inputs == list(function.inputs) and outputs == list(function.outputs):
+        return function
+    return replace(function, inputs=inputs, outputs=outputs)
+
+
+def size(model):
+    '''Return ``{'functions', 'values', 'param_nbytes', 'value_nbytes'}`` of ``model``.'''
+    param_nbytes = 0
+    for function in model.functions:
+        for param in function.params.values():
+            if type(param) is dict and b'ndarray' in param:
+                param_nbytes += len(param[b'ndarray'])
+            elif isinstance(param, (np.ndarray, LazyNDArray)):
+                param_nbytes += param.nbytes
+    return {
+        'functions': len(model.functions),
+        'values': len(model.values),
+        'param_nbytes': param_nbytes,
+        'value_nbytes': sum(_nbytes(v) for v in model.values)
+    }
@@ -0,0 +1,99 @@
+import struct
+
+
+class Reader():
+    """Minimal msgpack decoder working directly on a buffer.
+
+    Objects are decoded as ``msgpack.unpackb`` does with its default options,
+    except that the payload of every ``b'ndarray'`` entry is returned as a
+    ``memoryview`` slice of the underlying buffer instead of a copy.
+    """
+
+    def __init__(self, buf, offset=0):
+        self.buf = memoryview(buf)
+        self.pos = offset
+
+    def read(self):
+        return self._read(False)
+
+    def _take(self, n):
+        start = self.pos
+        self.pos += n
+        if self.pos > len(self.buf):
+            raise ValueError('unexpected end of msgpack data')
+        return self.buf[start:self.pos]
+
+    def _unpack(self, fmt):
+        size = struct.calcsize(fmt)
+        x, = struct.unpack_from(fmt, self.buf, self.pos)
+        self.pos += size
+        return x
+
+    def _raw(self, n, view):
+        data = self._take(n)
+        return data if view else data.tobytes()
+
+    def _array(self, n):
+        return [self._read(False) for _ in range(n)]
+
+    def _map(self, n):
+        result = {}
+        for _ in range(n):
+            k = self._read(False)
+            result[k] = self._read(k == b'ndarray')
+        return result
+
+    def _read(self, view):
+        b = self._unpack('B')
+        if b <= 0x7f:
+            return b
+        elif b <= 0x8f:
+            return self._map(b & 0x0f)
+        elif b <= 0x9f:
+            return self._array(b & 0x0f)
+        elif b <= 0xbf:
+            return self._raw(b & 0x1f, view)
+        elif b >= 0xe0:
+            return b - 0x100
+        elif b == 0xc0:
+            return None
+        elif b == 0xc2:
+            return False
+        elif b == 0xc3:
+            return True
+        elif b in (0xc4, 0xd9):
+            return self._raw(self._unpack('B'), view)
+        elif b in (0xc5, 0xda):
+            return self._raw(self._unpack('>H'), view)
+        elif b in (0xc6, 0xdb):
+            return self._raw(self._unpack('>I'), view)
+        elif b == 0xca:
+            return self._unpack('>f')
+        elif b == 0xcb:
+            return self._unpack('>d')
+        elif b == 0xcc:
+            return self._unpack('B')
+        elif b == 0xcd:
+            return self._unpack('>H')
+        elif b == 0xce:
+            return self._unpack('>I')
+        elif b == 0xcf:
+            return self._unpack('>Q')
+        elif b == 0xd0:
+            return self._unpack('b')
+        elif b == 0xd1:
+            return self._unpack('>h')
+        elif b == 0xd2:
+            return self._unpack('>i')
+        elif b == 0xd3:
+            return self._unpack('>q')
+        elif b == 0xdc:
+            return self._array(self._unpack('>H'))
+        elif b == 0xdd:
+            return self._array(self._unpack('>I'))
+        elif b == 0xde:
+            return self._map(self._unpack('>H'))
+        elif b == 0xdf:
+            return self._map(self._unpack('>I'))
+        else:
+            raise ValueError('unsupported msgpack type: 0x{:02x}'.format(b))
@@ -0,0 +1,204 @@
+import heapq
+import numpy
+from .nnoir import InvalidNNOIRData
+from .functions import AddConstant, Bias, BroadcastTo, ClippedReLU, Constant, Convolution2D, Dropout, ELU, LeakyReLU, Linear, \
+    MulConstant, ReLU, Scale, Sigmoid, Tanh
+from .memory import MemoryPlan
+
+# functions computing each output element from the same element of their only
+# input; their run() writes into the array given as ``out``
+ELEMENTWISE = (AddConstant, Bias, ClippedReLU, Dropout, ELU, LeakyReLU, MulConstant, ReLU, Scale, Sigmoid, Tanh)
+
+# other functions whose run() computes their result into ``out`` when it has
+# the right shape and dtype
+WITH_OUT = (Convolution2D, Linear)
+
+
+class Runtime():
+    '''Execute a NNOIR model on the CPU with the ``run()`` of its functions.
+
+    The execution order is computed once from the data dependencies of
+    ``model.functions``; each call then binds the inputs by name, runs the
+    schedule and collects ``model.outputs``.
+
+    Every intermediate value is dropped right after its last consumer has
+    run. ``memory_plan`` assigns the intermediates to offsets in a single
+    arena; its ``report()`` compares the planned peak with the sum of all
+    intermediates. With ``arena=True`` the arena is allocated once, and
+    elementwise functions, ``Linear`` and ``Convolution2D`` compute their
+    results directly into their slots. Other functions allocate their
+    results as usual, so the planned peak only bounds the memory of the
+    former. Results that are views of a slot other than their own are
+    copied, so no value refers to a slot that may be reused. Such a runtime
+    must not be run from several threads at once.
+
+    Unless ``fuse`` is false, a function followed by a chain of elementwise
+    functions (see ``chains()``) runs as one step: the elementwise functions
+    update the result of the first one in place whenever it is a new array.
+    The memory plan follows the chains: a chain is one step, and the values
+    inside it are never stored.
+    '''
+
+    def __init__(self, model, arena=False, fuse=True):
+        self.model = model
+        self.values = {v.name: v for v in model.values}
+        self.schedule = schedule(model)
+        self.chains = chains(self.schedule, model.outputs) if fuse else [[i] for i in range(len(self.schedule))]
+        # the plan follows the execution order of the chains
+        steps = [_Step([self.schedule[i] for i in chain]) for chain in self.chains]
+        self.memory_plan = MemoryPlan(model, steps)
+        self.frees = [[] for _ in steps]
+        for name, (first, last) in self.memory_plan.lifetimes.items():
+            if name not in model.outputs and last >= 0:
+                self.frees[last].append(name)
+        self.arena = self.memory_plan.allocate() if arena else None
+        self.slots = {}
+        if arena:
+            for name in self.memory_plan.offsets:
+                self.slots[name] = self.memory_plan.buffer(self.arena, self.values[name])
+
+    def __call__(self, *xs):
+        return self.run(*xs)
+
+    def run(self, *xs):
+        '''Run the model on ``xs`` given in the order of ``model.inputs``.
+
+        A single dict mapping input names to arrays is accepted as well. The
+        output is returned as is for single-output models and as a tuple
+        otherwise.
+        '''
+        env = self._bind(xs)
+        for chain, frees in zip(self.chains, self.frees):
+            self._run_chain(chain, env)
+            for name in frees:
+                del env[name]
+        ys = tuple(env[name] for name in self.model.outputs)
+        return ys[0] if len(ys) == 1 else ys
+
+    def _bind(self, xs):
+        if len(xs) == 1 and isinstance(xs[0], dict):
+            xs = [xs[0][name] for name in self.model.inputs]
+        if len(xs) != len(self.model.inputs):
+            raise Exception('the number of input variables and the expected number of inputs do not match.')
+        return dict(zip(self.model.inputs, xs))
+
+    def _run_chain(self, chain, env):
+        function = self.schedule[chain[0]]
+        args = [env[name] for name in function.inputs]
+        if isinstance(function, BroadcastTo):
+            # the target shape is only known from the output value
+            args.append(tuple(self.values[function.outputs[0]].shape))
+        slot = self.slots.get(self.schedule[chain[-1]].outputs[0])
+        if isinstance(function, ELEMENTWISE) and slot is not None and slot.shape == args[0].shape and \
+                slot.dtype == args[0].dtype or isinstance(function, WITH_OUT) and slot is not None:
+            ys = (function.run(*args, out=slot),)
+        else:
+            ys = function.run(*args)
+            if len(function.outputs) == 1:
+                ys = (ys,)
+        for i in chain[1:]:
+            y = ys[0]
+            if _owned(y, args):
+                ys = (self.schedule[i].run(y, out=y),)
+            else:
+                args = [y]
+                ys = (self.schedule[i].run(y),)
+        for name, y in zip(self.schedule[chain[-1]].outputs, ys):
+            env[name] = y if self.arena is None else self._place(name, y)
+
+    def _place(self, name, y):
+        # no value may be a view of a slot other than its own, which may be
+        # reused once the value it belongs to is dropped
+        if not numpy.may_share_memory(y, self.arena):
+            return y
+        slot = self.slots.get(name)
+        if y is slot:
+            return y
+        if slot is not None and slot.shape == y.shape and slot.dtype == y.dtype:
+            numpy.copyto(slot, y)
+            return slot
+        return y.copy()
+
+
+class _Step():
+    # a chain as seen from outside: the values inside it are never stored
+    def __init__(self, functions):
+        self.inputs = functions[0].inputs
+        self.outputs = functions[-1].outputs
+
+
+def _owned(y, args):
+    # whether y may be overwritten: a writable float array that is not a view
+    # of any of the arguments it was computed from
+    return isinstance(y, numpy.ndarray) and y.dtype.kind == 'f' and y.flags.writeable and \
+        not any(numpy.may_share_memory(y, x) for x in args)
+
+
+def chains(schedule, outputs=()):
+    '''Group the indices of ``schedule`` into chains that can run as one step.
+
+    An elementwise function with a single input joins the chain of the
+    producer of that input when the value is neither a model output nor
+    used by any other function. Each chain is listed at the position of its
+    first function.
+    '''
+    consumers = {}
+    for function in schedule:
+        for name in function.inputs:
+            consumers[name] = consumers.get(name, 0) + 1
+    tails = {}  # output of the last function of a chain -> chain
+    result = []
+    for i, function in enumerate(schedule):
+        elementwise = isinstance(function, ELEMENTWISE) and len(function.inputs) == 1 and len(function.outputs) == 1
+        chain = None
+        if elementwise:
+            name = function.inputs[0]
+            chain = tails.pop(name, None)
+            if consumers[name] != 1 or name in outputs:
+                chain = None
+        if chain is None:
+            chain = []
+            result.append(chain)
+        chain.append(i)
+        # Constant returns its param, which must never be updated in place
+        if len(function.outputs) == 1 and not isinstance(function, Constant):
+            tails[function.outputs[0]] = chain
+    return result
+
+
+def schedule(model):
+    '''Return ``model.functions`` sorted so that every function follows the producers of its inputs.
+
+    Among the functions that are ready to run, the one listed first in the
+    model is scheduled first.
+    '''
+    producers = {}
+    for i, function in enumerate(model.functions):
+        for name in function.outputs:
+            if name in producers:
+                raise InvalidNNOIRData('value "{}" is produced by more than one function.'.format(name))
+            producers[name] = i
+    waiting = []
+    consumers = [[] for _ in model.functions]
+    for i, function in enumerate(model.functions):
+        deps = set()
+        for name in function.inputs:
+            if name in producers:
+                deps.add(producers[name])
+            elif name not in model.inputs:
+                raise InvalidNNOIRData('value "{}" is neither an input nor produced by any function.'.format(name))
+        waiting.append(len(deps))
+        for j in deps:
+            consumers[j].append(i)
+    ready = [i for i, n in enumerate(waiting) if n == 0]
+    result = []
+    while ready:
+        i = heapq.heappop(ready)
+        result.append(model.functions[i])
+        for j in consumers[i]:
+            waiting[j] -= 1
+            if waiting[j] == 0:
+                heapq.heappush(ready, j)
+    if len(result) != len(model.functions):
+        raise InvalidNNOIRData('the graph has a cycle.')
+    return result
@@ -0,0 +1,213 @@
+import hashlib
+import io
+import struct
+import msgpack
+import numpy
+from . import compression as compression_module
+from . import npy
+from .lazy import LazyNDArray
+
+ALIGNMENT = 64
+
+
+def align(n, alignment=ALIGNMENT):
+    return (n + alignment - 1) // alignment * alignment
+
+
+class NDArray():
+    '''An ndarray param whose ``.npy`` image is produced while it is written.
+
+    Only the ``.npy`` header is built up front; the data is written straight
+    from the array buffer by ``write()``. An array that is not C-contiguous
+    (or a lazy param that is not stored as ``.npy``) is copied or decoded
+    there, so at most one such copy is alive while a model is written.
+    '''
+
+    def __init__(self, array):
+        if type(array) is dict or (type(array) is LazyNDArray and array.is_npy):
+            # already a .npy image; copy it through without decoding
+            self.array = None
+            self.header = b''
+            self.data = array[b'ndarray'] if type(array) is dict else array.buf
+            return
+        if type(array) is not LazyNDArray:
+            array = numpy.asarray(array)
+        self.array = array
+        with io.BytesIO() as out:
+            if array.dtype.hasobject:
+                numpy.save(out, array)
+                self.data = out.getvalue()
+                self.header = b''
+                return
+            # the data is written in C order, whatever the layout of array
+            d = {'descr': numpy.lib.format.dtype_to_descr(array.dtype), 'fortran_order': False, 'shape': tuple(array.shape)}
+            try:
+                numpy.lib.format.write_array_header_1_0(out, d)
+            except ValueError:
+                numpy.lib.format.write_array_header_2_0(out, d)
+            self.header = out.getvalue()
+        self.data = None
+
+    def __len__(self):
+        if self.data is not None:
+            return len(self.header) + len(self.data)
+        return len(self.header) + self.array.nbytes
+
+    def write(self, f):
+        f.write(self.header)
+        if self.data is not None:
+            f.write(self.data)
+            return
+        array = self.array.decode() if type(self.array) is LazyNDArray else self.array
+        f.write(_contiguous(array).reshape(-1).view(numpy.uint8))
+
+
+class Writer():
+    '''Incremental msgpack encoder producing the same bytes as ``msgpack.packb``.
+
+    Maps and arrays are written header first and then element by element, and
+    ``NDArray`` entries are copied from their buffer directly into the file.
+    '''
+
+    def __init__(self, f):
+        self.f = f
+        self.packer = msgpack.Packer()
+        self.use_bin_type = self.packer.pack(b'') != b'\xa0'
+
+    def write(self, obj):
+        if isinstance(obj, dict):
+            self.f.write(self.packer.pack_map_header(len(obj)))
+            for k, v in obj.items():
+                self.write(k)
+                self.write(v)
+        elif isinstance(obj, (list, tuple)):
+            self.f.write(self.packer.pack_array_header(len(obj)))
+            for v in obj:
+                self.write(v)
+        elif isinstance(obj, NDArray):
+            self.f.write(self._bytes_header(len(obj)))
+            obj.write(self.f)
+        else:
+            self.f.write(self.packer.pack(obj))
+
+    def _bytes_header(self, n):
+        if self.use_bin_type:
+            if n < 0x100:
+                return struct.pack('>BB', 0xc4, n)
+            elif n < 0x10000:
+                return struct.pack('>BH', 0xc5, n)
+            else:
+                return struct.pack('>BI', 0xc6, n)
+        else:
+            if n < 0x20:
+                return struct.pack('>B', 0xa0 | n)
+            elif n < 0x10000:
+                return struct.pack('>BH', 0xda, n)
+            else:
+                return struct.pack('>BI', 0xdb, n)
+
+
+class TensorTable():
+    '''Shared tables of the v1 container.
+
+    ``add`` registers an ndarray param and returns the ``{b'tensor': index}``
+    reference that replaces it in the graph header. ``entries`` is the
+    offset/length/dtype/shape index stored in the header. Payloads are raw
+    C-order array data, each starting at a multiple of ``ALIGNMENT`` from the
+    beginning of the section, which itself starts at the first aligned file
+    offset after the header.
+
+    Tensors are content addressed: an array equal in dtype, shape and bytes
+    to one already registered gets the existing reference. Sub-models given
+    to ``add_model`` are kept once each in ``models`` the same way and are
+    referenced as ``{b'model': index}``.
+
+    With ``compression`` (a key of ``compression.CODECS``) each tensor is
+    stored as independently compressed chunks, and is kept raw when that
+    does not make it smaller.
+    '''
+
+    def __init__(self, compression=None, shuffle=False):
+        self.compression = compression
+        self.shuffle = shuffle
+        self.arrays = []
+        self.entries = []
+        self.models = []
+        self.size = 0
+        self._sources = []
+        self._indices = {}
+        self._digests = {}
+        self._model_indices = {}
+        self._model_digests = {}
+
+    def add(self, source):
+        if id(source) in self._indices:
+            return {b'tensor': self._indices[id(source)]}
+        self._sources.append(source)
+        array = source
+        if type(array) is dict:
+            array = npy.from_buffer(array[b'ndarray'])
+        elif type(array) is LazyNDArray:
+            array = array.decode()
+        else:
+            array = numpy.asarray(array)
+        if array.dtype.hasobject:
+            raise TypeError('object arrays can not be stored in a tensor section')
+        digest = _digest(array)
+        if digest not in self._digests:
+            offset = align(self.size)
+            entry = {
+                b'offset': offset,
+                b'length': array.nbytes,
+                b'dtype': array.dtype.str.encode(),
+                b'shape': list(array.shape)
+            }
+            if self.compression is not None:
+                chunks, info = compression_module.compress(_contiguous(array), self.compression, self.shuffle)
+                if sum(info[b'chunks']) < array.nbytes:
+                    array = chunks
+                    entry[b'length'] = sum(info[b'chunks'])
+                    entry.update(info)
+            self.arrays.append(array)
+            self.entries.append(entry)
+            self.size = offset + entry[b'length']
+            self._digests[digest] = len(self.entries) - 1
+        self._indices[id(source)] = self._digests[digest]
+        return {b'tensor': self._digests[digest]}
+
+    def add_model(self, model):
+        if id(model) in self._model_indices:
+            return {b'model': self._model_indices[id(model)]}
+        self._sources.append(model)
+        encoded = model.to_model(self.add, self.add_model)
+        digest = hashlib.sha256(msgpack.packb(encoded)).digest()
+        if digest not in self._model_digests:
+            self.models.append(encoded)
+            self._model_digests[digest] = len(self.models) - 1
+        self._model_indices[id(model)] = self._model_digests[digest]
+        return {b'model': self._model_digests[digest]}
+
+    def write(self, f, position):
+        '''Write the section to ``f``, whose current offset is ``position``.'''
+        f.write(bytes(align(position) - position))
+        end = 0
+        for array, entry in zip(self.arrays, self.entries):
+            f.write(bytes(entry[b'offset'] - end))
+            if b'compression' in entry:
+                for chunk in array:
+                    f.write(chunk)
+            else:
+                f.write(_contiguous(array).reshape(-1).view(numpy.uint8))
+            end = entry[b'offset'] + entry[b'length']
+
+
+def _contiguous(array):
+    return array if array.flags.c_contiguous else array.copy()
+
+
+def _digest(array):
+    h = hashlib.sha256()
+    h.update(array.dtype.str.encode())
+    h.update(repr(array.shape).encode())
+    h.update(_contiguous(array).reshape(-1).view(numpy.uint8))
+    return h.digest()
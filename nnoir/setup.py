@@ -25,5 +25,5 @@ setup(
     keywords='nnoir machine learning',
     packages=find_packages(),
     install_requires=['numpy', 'msgpack-python'],
-    scripts=['nnoir2dot']
+    scripts=['nnoir2dot', 'nnoir-info']
 )
@@ -0,0 +1,7 @@
+import os
+import glob
+
+
+def nnoir_files():
+    '''Return the paths of the ``.nnoir`` models next to the tests.'''
+    return sorted(glob.glob(os.path.join(os.path.abspath(os.path.dirname(__file__)), '*.nnoir')))
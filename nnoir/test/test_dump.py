@@ -0,0 +1,55 @@
+import io
+import os
+import tempfile
+import nnoir
+import numpy as np
+from helpers import nnoir_files
+
+
+def dumped(model):
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, 'model.nnoir')
+        model.dump(path)
+        with open(path, 'rb') as f:
+            return f.read()
+
+
+def test_dump_matches_pack():
+    for path in nnoir_files():
+        model = nnoir.load(path)
+        assert dumped(model) == model.pack()
+
+
+def test_dump_array_layouts():
+    in_ch = 300
+    out_ch = 200
+    inputs = [nnoir.Value(b'v0', np.zeros((2, in_ch)).astype(np.float32))]
+    outputs = [nnoir.Value(b'v1', np.zeros((2, out_ch)).astype(np.float32))]
+    Ws = [
+        np.random.randn(out_ch, in_ch).astype(np.float32),
+        np.asfortranarray(np.random.randn(out_ch, in_ch)),
+        np.random.randn(in_ch, out_ch * 2).astype(np.float32)[:, ::2].T,
+        np.random.randn(out_ch, in_ch).astype('>f4'),
+    ]
+    for W in Ws:
+        b = np.random.randn(out_ch).astype(np.float32)
+        functions = [nnoir.functions.Linear([b'v0'], [b'v1'], W=W, b=b)]
+        model = nnoir.NNOIR(b'Linear', b'nnoir_test', '0.1', [b'v0'], [b'v1'], inputs + outputs, functions)
+        assert dumped(model) == model.pack()
+
+
+def test_dump_lazy():
+    for path in nnoir_files():
+        model = nnoir.load(path, lazy=True)
+        with open(path, 'rb') as f:
+            assert dumped(model) == f.read()
+
+
+def test_dump_copies_at_write():
+    # non-contiguous params are only made contiguous while they are written
+    W = np.asfortranarray(np.random.randn(20, 30).astype(np.float32))
+    array = nnoir.writer.NDArray(W)
+    assert np.shares_memory(array.array, W)
+    with io.BytesIO() as f:
+        array.write(f)
+        assert f.getvalue() == nnoir.functions.function._encode_ndarray(W)[b'ndarray']
@@ -0,0 +1,266 @@
+import numpy as np
+import nnoir
+from nnoir.functions import util
+
+
+def im2col_reference(img, kernel, stride, ph, pw, dilate, pval=0):
+    n, c, h, w = img.shape
+    kh, kw = kernel
+    sy, sx = stride
+    dy, dx = dilate
+    out_h = util.get_conv_outsize(h, kh, sy, ph[0], ph[1], d=dy)
+    out_w = util.get_conv_outsize(w, kw, sx, pw[0], pw[1], d=dx)
+    img = np.pad(img, ((0, 0), (0, 0), ph, pw), mode='constant', constant_values=(pval,))
+    col = np.empty((n, c, kh, kw, out_h, out_w), dtype=img.dtype)
+    for j in range(kh):
+        for i in range(kw):
+            col[:, :, j, i] = img[:, :, j * dy:j * dy + sy * out_h:sy, i * dx:i * dx + sx * out_w:sx]
+    return col
+
+
+def test_im2col_view():
+    x = np.random.randn(2, 3, 9, 8).astype(np.float32)
+    for kernel, stride, ph, pw, dilate in [((3, 3), (1, 1), (1, 1), (1, 1), (1, 1)),
+                                           ((3, 2), (2, 3), (0, 1), (2, 0), (1, 1)),
+                                           ((3, 3), (2, 1), (2, 2), (1, 2), (2, 3)),
+                                           ((1, 1), (1, 1), (0, 0), (0, 0), (1, 1))]:
+        img, col = util.im2col_cpu(x, kernel, stride, ph, pw, dilate)
+        assert np.shares_memory(img, col)
+        assert not col.flags.writeable
+        assert np.array_equal(col, im2col_reference(x, kernel, stride, ph, pw, dilate))
+    _, col = util.im2col_cpu(x, (2, 2), (2, 2), (1, 1), (1, 1), pval=-np.inf)
+    assert np.array_equal(col, im2col_reference(x, (2, 2), (2, 2), (1, 1), (1, 1), (1, 1), -np.inf))
+
+
+def convolution_2d_reference(x, W, b, stride, pad_h, pad_w, dilate, groups):
+    out_ch, in_ch = W.shape[:2]
+    ys = []
+    for g in range(groups):
+        xg = x[:, g * in_ch:(g + 1) * in_ch]
+        Wg = W[g * out_ch // groups:(g + 1) * out_ch // groups]
+        col = im2col_reference(xg, W.shape[2:], stride, pad_h, pad_w, dilate)
+        ys.append(np.rollaxis(np.tensordot(col, Wg, ((1, 2, 3), (1, 2, 3))), 3, 1))
+    return np.concatenate(ys, axis=1) + b[:, None, None]
+
+
+def test_convolution_2d_groups():
+    x = np.random.randn(2, 6, 9, 8).astype(np.float32)
+    for groups, kernel, stride, pad, dilate in [(1, (3, 3), (1, 1), (1, 1), (1, 1)),
+                                                (3, (3, 2), (2, 1), (1, 0), (1, 2)),
+                                                (2, (1, 1), (1, 1), (0, 0), (1, 1)),
+                                                (3, (1, 1), (2, 2), (0, 0), (1, 1)),
+                                                (6, (3, 3), (1, 1), (1, 1), (1, 1))]:
+        W = np.random.randn(12, 6 // groups, *kernel).astype(np.float32)
+        b = np.random.randn(12).astype(np.float32)
+        params = dict(W=W, b=b, stride=stride, pad_h=pad, pad_w=pad, dilate=dilate, groups=groups)
+        y = nnoir.functions.Convolution2D([b'x'], [b'y'], **params).run(x)
+        assert y.dtype == np.float32
+        assert np.allclose(y, convolution_2d_reference(x, **params), atol=1e-4)
+
+
+def test_prepared_weights():
+    x = np.random.randn(4, 3).astype(np.float32)
+    W = np.random.randn(5, 3).astype(np.float32)
+    b = np.random.randn(5).astype(np.float32)
+    linear = nnoir.functions.Linear([b'x'], [b'y'], W=W, b=b)
+    assert np.allclose(linear.run(x), x.dot(W.T) + b, atol=1e-5)
+    prepared = linear._prepared[nnoir.functions.linear._layout][1][0]
+    assert np.shares_memory(prepared, W)
+    linear.run(x)
+    assert linear._prepared[nnoir.functions.linear._layout][1][0] is prepared
+    linear.params['W'] = 2 * W
+    assert np.allclose(linear.run(x), x.dot(2 * W.T) + b, atol=1e-5)
+    linear.params['b'] = None
+    assert np.allclose(linear.run(x), x.dot(2 * W.T), atol=1e-5)
+
+
+def test_depthwise_convolution_2d_direct():
+    x = np.random.randn(2, 4, 9, 8).astype(np.float32)
+    for D, kernel, stride, pad, dilate in [(1, (3, 3), (1, 1), (1, 1), (1, 1)),
+                                           (3, (3, 2), (2, 3), (2, 1), (1, 1)),
+                                           (2, (3, 3), (1, 2), (2, 2), (2, 1))]:
+        W = np.random.randn(D, 4, *kernel).astype(np.float32)
+        b = np.random.randn(4 * D).astype(np.float32)
+        f = nnoir.functions.DepthwiseConvolution2D([b'x'], [b'y'], W=W, b=b, stride=stride,
+                                                   pad_h=pad, pad_w=pad, dilate=dilate)
+        y = f.run(x)
+        _, col = util.im2col_cpu(x, kernel, stride, pad, pad, dilate)
+        assert y.dtype == np.float32
+        assert np.allclose(y, f._run_im2col(col), atol=1e-4)
+        # output channel c * D + d is input channel c convolved with W[d, c]
+        W_ = W.transpose(1, 0, 2, 3).reshape(4 * D, 1, *kernel)
+        expected = convolution_2d_reference(x, W_, b, stride, pad, pad, dilate, 4)
+        assert np.allclose(y, expected, atol=1e-4)
+
+
+def test_convolution_2d_engines():
+    x = np.random.randn(2, 6, 11, 10).astype(np.float32)
+    for engines, kernel, stride, pad_h, pad_w, dilate, groups in [
+            (('winograd', 'fft'), (3, 3), (1, 1), (1, 1), (1, 1), (1, 1), 1),
+            (('winograd', 'fft'), (3, 3), (1, 1), (0, 2), (1, 0), (1, 1), 3),
+            (('fft',), (5, 3), (2, 1), (2, 2), (1, 1), (1, 2), 2),
+            (('fft',), (7, 7), (1, 1), (3, 3), (3, 3), (1, 1), 1)]:
+        W = np.random.randn(6, 6 // groups, *kernel).astype(np.float32)
+        b = np.random.randn(6).astype(np.float32)
+        f = nnoir.functions.Convolution2D([b'x'], [b'y'], W=W, b=b, stride=stride, pad_h=pad_h, pad_w=pad_w,
+                                          dilate=dilate, groups=groups)
+        f.engine = 'gemm'
+        expected = f.run(x)
+        for engine in engines:
+            f.engine = engine
+            for _ in range(2):  # with and without cached weights
+                y = f.run(x)
+                assert y.dtype == np.float32
+                assert y.shape == expected.shape
+                assert np.allclose(y, expected, atol=1e-4)
+    f.engine = 'winograd'
+    try:
+        f.run(x)
+        assert False
+    except Exception as e:
+        assert 'winograd' in str(e)
+
+
+def test_convolution_2d_auto_engine():
+    def engine(in_ch, kernel, stride=(1, 1)):
+        W = np.zeros((4, in_ch) + kernel, dtype=np.float32)
+        return nnoir.functions.Convolution2D([b'x'], [b'y'], W=W, b=None, stride=stride, pad_h=(0, 0), pad_w=(0, 0),
+                                             dilate=(1, 1), groups=1)._auto_engine()
+    assert engine(256, (3, 3)) == 'winograd'
+    assert engine(3, (3, 3)) == 'gemm'
+    assert engine(256, (3, 3), (2, 2)) == 'gemm'
+    assert engine(64, (7, 7)) == 'fft'
+    assert engine(3, (7, 7)) == 'gemm'
+    W = np.zeros((4, 256, 3, 3), dtype=np.float32)
+    assert nnoir.functions.Convolution2D([b'x'], [b'y'], W=W, b=None, stride=(1, 1), pad_h=(0, 0), pad_w=(0, 0),
+                                         dilate=(1, 1), groups=1).engine == 'gemm'
+
+
+def test_convolution_2d_fft_cache():
+    W = np.random.randn(4, 3, 7, 7).astype(np.float32)
+    f = nnoir.functions.Convolution2D([b'x'], [b'y'], W=W, b=None, stride=(1, 1), pad_h=(3, 3), pad_w=(3, 3),
+                                      dilate=(1, 1), groups=1)
+    f.engine = 'fft'
+    for size in [8, 12, 8]:
+        f.run(np.random.randn(1, 3, size, size).astype(np.float32))
+    # only the spectra of the last input size are kept
+    assert list(f._prepared[nnoir.functions.convolution_2d._spectra][1].keys()) == [(14, 14)]
+
+
+def test_convolution_2d_winograd_integer_weights():
+    x = np.random.randn(2, 4, 8, 8).astype(np.float32)
+    W = np.random.randint(-3, 4, size=(5, 4, 3, 3)).astype(np.int32)
+    f = nnoir.functions.Convolution2D([b'x'], [b'y'], W=W, b=None, stride=(1, 1), pad_h=(1, 1), pad_w=(1, 1),
+                                      dilate=(1, 1), groups=1)
+    expected = f.run(x)
+    f.engine = 'winograd'
+    assert np.allclose(f.run(x), expected, atol=1e-4)
+
+
+def test_pooling_2d():
+    x = np.random.randn(2, 3, 9, 8).astype(np.float32)
+    ones = np.ones(x.shape, dtype=np.float32)
+    for kernel, stride, pad_h, pad_w in [((3, 3), (2, 2), (1, 1), (1, 1)),
+                                         ((2, 3), (1, 2), (0, 1), (2, 1)),
+                                         ((9, 8), (1, 1), (0, 0), (0, 0))]:
+        params = dict(kernel=kernel, stride=stride, pad_h=pad_h, pad_w=pad_w)
+        col = im2col_reference(x, kernel, stride, pad_h, pad_w, (1, 1), -np.inf)
+        y = nnoir.functions.MaxPooling2D([b'x'], [b'y'], **params).run(x)
+        assert np.array_equal(y, col.max(axis=(2, 3)))
+        col = im2col_reference(x, kernel, stride, pad_h, pad_w, (1, 1))
+        mask = im2col_reference(ones, kernel, stride, pad_h, pad_w, (1, 1))
+        f = nnoir.functions.AveragePooling2D([b'x'], [b'y'], count_exclude_pad=False, **params)
+        y = f.run(x)
+        assert y.dtype == np.float32
+        assert np.allclose(y, col.mean(axis=(2, 3)), atol=1e-6)
+        f.params['count_exclude_pad'] = True
+        for _ in range(2):
+            y = f.run(x)
+            assert y.dtype == np.float32
+            assert np.allclose(y, col.sum(axis=(2, 3)) / mask.sum(axis=(2, 3)), atol=1e-6)
+
+
+def test_local_response_normalization():
+    def reference(x, n, k, alpha, beta):
+        sq = np.square(x.astype(np.float64))
+        R = sq.copy()
+        for i in range(1, n // 2 + 1):
+            R[:, i:] += sq[:, :-i]
+            R[:, :-i] += sq[:, i:]
+        return x * (k + alpha * R) ** -beta
+    x = 10 * np.random.randn(2, 7, 4, 3).astype(np.float32)
+    for n in (1, 4, 5, 15):
+        for beta in (0.75, 0.5, 0.8):
+            params = dict(n=n, k=2.0, alpha=1e-4, beta=beta)
+            y = nnoir.functions.LocalResponseNormalization([b'x'], [b'y'], **params).run(x)
+            assert y.dtype == np.float32
+            assert np.allclose(y, reference(x, **params), rtol=1e-5, atol=1e-6)
+    y = nnoir.functions.LocalResponseNormalization([b'x'], [b'y'], n=5, k=2.0, alpha=1e-4, beta=0.75).run(x[:, :, 0, 0])
+    assert np.allclose(y, reference(x[:, :, 0, 0], 5, 2.0, 1e-4, 0.75), rtol=1e-5, atol=1e-6)
+
+
+def test_bilinear_2d():
+    def reference(x, out_h, out_w):
+        # the previous gather-based implementation
+        batch, ch, in_h, in_w = x.shape
+        V = (np.arange(out_h) * (in_h - 1) / (out_h - 1)).reshape(out_h, 1)
+        V0 = np.maximum(0, np.minimum(np.floor(V), in_h - 2)).astype('int32')
+        V1 = V0 + 1
+        U = (np.arange(out_w) * (in_w - 1) / (out_w - 1)).reshape(1, out_w)
+        U0 = np.maximum(0, np.minimum(np.floor(U), in_w - 2)).astype('int32')
+        U1 = U0 + 1
+        x0 = x[:, :, V0.reshape(out_h), :]
+        x1 = x[:, :, V1.reshape(out_h), :]
+        return (U1 - U) * (V1 - V) * x0[:, :, :, U0.reshape(out_w)] + (U - U0) * (V1 - V) * x0[:, :, :, U1.reshape(out_w)] + \
+            (U1 - U) * (V - V0) * x1[:, :, :, U0.reshape(out_w)] + (U - U0) * (V - V0) * x1[:, :, :, U1.reshape(out_w)]
+    x = np.random.randn(2, 3, 9, 10).astype(np.float32)
+    for size in [(4, 5), (17, 23), (9, 10)]:
+        f = nnoir.functions.Bilinear2D([b'x'], [b'y'], size=size)
+        for _ in range(2):
+            y = f.run(x)
+            assert y.dtype == np.float32
+            assert np.allclose(y, reference(x, *size), atol=1e-5)
+
+
+def test_unpooling_2d():
+    def reference(x, kh, kw, sy, sx, ph, pw, outh, outw):
+        col = np.tile(x[:, :, None, None], (1, 1, kh, kw, 1, 1))
+        return util.col2im_cpu(col, (sy, sx), ph, pw, outh, outw)
+    x = np.random.randn(2, 3, 5, 6).astype(np.float32)
+    for kh, kw, sy, sx, ph, pw, outh, outw in [(2, 3, 1, 2, 1, 2, 4, 9),
+                                               (2, 2, 2, 2, 0, 0, 10, 12),
+                                               (2, 3, 2, 3, 1, 0, 8, 18),
+                                               (3, 3, 3, 3, 1, 1, 13, 16)]:
+        params = dict(kh=kh, kw=kw, sy=sy, sx=sx, ph=ph, pw=pw, outh=outh, outw=outw)
+        y = nnoir.functions.Unpooling2D([b'x'], [b'y'], cover_all=False, **params).run(x)
+        assert np.array_equal(y, reference(x, **params))
+
+
+def test_softmax():
+    x = np.random.randn(4, 5, 3).astype(np.float32)
+    for axis in (1, 2):
+        y = nnoir.functions.Softmax([b'x'], [b'y'], axis=axis).run(x)
+        assert y.dtype == np.float32
+        assert np.allclose(y, np.exp(x) / np.sum(np.exp(x), axis, keepdims=True), atol=1e-6)
+    y = nnoir.functions.Softmax([b'x'], [b'y'], axis=1).run(np.array([[1000.0, 0.0, -1000.0]], dtype=np.float32))
+    assert np.allclose(y, [[1.0, 0.0, 0.0]])
+
+
+def test_softmax_cross_entropy():
+    def reference(x, t, normalize):
+        x = x.astype(np.float64)
+        p = np.exp(x) / np.sum(np.exp(x), axis=1, keepdims=True)
+        log_p = np.log(np.take_along_axis(p, np.expand_dims(np.maximum(t, 0), 1), axis=1)[:, 0])
+        valid = t != -1
+        return -np.sum(log_p[valid]) / (np.count_nonzero(valid) if normalize else x.shape[0])
+    x = np.random.randn(6, 5, 2).astype(np.float32)
+    t = np.random.randint(0, 5, (6, 2))
+    t[1, 0] = t[4, 1] = -1
+    for normalize in (True, False):
+        f = nnoir.functions.SoftmaxCrossEntropy([b'x', b't'], [b'y'], normalize=normalize, cache_score=False)
+        for x_, t_ in [(x, t), (x[:, :, 0], t[:, 0])]:
+            y = f.run(x_, t_)
+            assert y.shape == () and y.dtype == np.float32
+            assert np.allclose(y, reference(x_, t_, normalize), atol=1e-5)
+    y = f.run(np.array([[1000.0, 0.0]], dtype=np.float32), np.array([1]))
+    assert np.allclose(y, 1000.0)
@@ -0,0 +1,58 @@
+import os
+import json
+import tempfile
+import nnoir
+import nnoir.info
+import numpy as np
+from helpers import nnoir_files
+
+
+def check(info, model):
+    assert info.name == model.name
+    assert [v.name for v in info.inputs] == model.inputs
+    assert [v.name for v in info.outputs] == model.outputs
+    assert [f.name for f in info.functions] == [f.__class__.__name__ for f in model.functions]
+    for f_info, f in zip(info.functions, model.functions):
+        for k, v in f.params.items():
+            if isinstance(v, np.ndarray):
+                assert f_info.params[k].shape == v.shape
+                assert f_info.params[k].dtype == v.dtype
+                assert f_info.params[k].nbytes == v.nbytes
+            else:
+                assert f_info.params[k] == v
+    json.dumps(info.to_dict())
+
+
+def test_inspect():
+    with tempfile.TemporaryDirectory() as d:
+        for path in nnoir_files():
+            model = nnoir.load(path)
+            check(nnoir.inspect(path), model)
+            v1_path = os.path.join(d, os.path.basename(path))
+            model.dump(v1_path, version=1)
+            check(nnoir.inspect(v1_path), model)
+
+
+def test_inspect_param_count():
+    W = np.random.randn(4, 3).astype(np.float32)
+    b = np.random.randn(4).astype(np.float32)
+    values = [nnoir.Value(b'v0', np.zeros((2, 3)).astype(np.float32)),
+              nnoir.Value(b'v1', np.zeros((2, 4)).astype(np.float32)),
+              nnoir.Value(b'v2', np.zeros((2, 4)).astype(np.float32))]
+    functions = [nnoir.functions.Linear([b'v0'], [b'v1'], W=W, b=b),
+                 nnoir.functions.Linear([b'v0'], [b'v2'], W=W, b=b)]
+    model = nnoir.NNOIR(b'Tied', b'nnoir_test', '0.1', [b'v0'], [b'v1', b'v2'], values, functions)
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, 'tied.nnoir')
+        model.dump(path)
+        assert nnoir.inspect(path).param_count == 2 * (W.size + b.size)
+        model.dump(path, version=1)
+        info = nnoir.inspect(path)
+        assert info.param_count == W.size + b.size
+        assert info.param_nbytes == W.nbytes + b.nbytes
+        assert info.largest_tensors(1)[0][2] == 'W'
+
+
+def test_inspect_module():
+    path = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'Linear.nnoir')
+    assert isinstance(nnoir.inspect(path), nnoir.info.ModelInfo)
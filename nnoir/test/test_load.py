@@ -0,0 +1,96 @@
+import os
+import tempfile
+import nnoir
+import numpy as np
+from helpers import nnoir_files
+
+
+def test_load_mmap():
+    for path in nnoir_files():
+        expected = nnoir.load(path)
+        actual = nnoir.load(path, mmap=True)
+        assert expected.pack() == actual.pack()
+
+
+def test_load_mmap_readonly_view():
+    W = np.arange(12).reshape(3, 4).astype(np.float32)
+    b = np.arange(3).astype(np.float32)
+    inputs = [nnoir.Value(b'v0', np.zeros((2, 4)).astype(np.float32))]
+    outputs = [nnoir.Value(b'v1', np.zeros((2, 3)).astype(np.float32))]
+    functions = [nnoir.functions.Linear([b'v0'], [b'v1'], W=W, b=b)]
+    model = nnoir.NNOIR(b'Linear', b'nnoir_test', '0.1', [b'v0'], [b'v1'], inputs + outputs, functions)
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, 'linear.nnoir')
+        model.dump(path)
+        loaded = nnoir.load(path, mmap=True)
+        W_ = loaded.functions[0].params['W']
+        assert not W_.flags.writeable
+        assert W_.base is not None
+        assert np.array_equal(W, W_)
+        x = np.ones((2, 4), dtype=np.float32)
+        assert np.array_equal(functions[0].run(x), loaded.functions[0].run(x))
+        # the mapping must be closed before the file can be removed everywhere
+        del loaded, W_
+
+
+def test_load_lazy():
+    for path in nnoir_files():
+        expected = nnoir.load(path)
+        actual = nnoir.load(path, lazy=True)
+        for f in actual.functions:
+            for v in f.params.values():
+                if isinstance(v, nnoir.lazy.LazyNDArray):
+                    assert not v.materialized
+        assert expected.pack() == actual.pack()
+
+
+def test_load_lazy_materialize():
+    path = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'Convolution2D.nnoir')
+    expected = nnoir.load(path)
+    actual = nnoir.load(path, lazy=True)
+    W = actual.functions[0].params['W']
+    assert W.shape == expected.functions[0].params['W'].shape
+    assert W.dtype == expected.functions[0].params['W'].dtype
+    assert not W.materialized
+    x = np.random.randn(2, 4, 10, 9).astype(np.float32)
+    assert np.array_equal(expected.functions[0].run(x), actual.functions[0].run(x))
+    assert W.materialized
+    W.release()
+    assert not W.materialized
+    assert np.array_equal(np.asarray(W), expected.functions[0].params['W'])
+
+
+def test_load_workers():
+    for path in nnoir_files():
+        expected = nnoir.load(path, workers=1).pack()
+        for kwargs in [{}, {'mmap': True}]:
+            timings = {}
+            assert nnoir.load(path, workers=4, timings=timings, **kwargs).pack() == expected
+            assert set(timings.keys()) == {'unpack', 'decode', 'construct'}
+            assert all(t >= 0 for t in timings.values())
+
+
+def test_load_invalid_tensor():
+    path = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'Linear.nnoir')
+    buf = nnoir.load(path).pack(version=1)
+    with tempfile.TemporaryDirectory() as d:
+        broken = os.path.join(d, 'broken.nnoir')
+        with open(broken, 'wb') as f:
+            f.write(buf[:-1])
+        try:
+            nnoir.load(broken)
+            assert False
+        except nnoir.nnoir.InvalidNNOIRData:
+            pass
+
+
+def test_load_lazy_arithmetic():
+    path = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'BatchNormalization.nnoir')
+    expected = nnoir.load(path).functions[0].params['avg_var']
+    for kwargs in [{}, {'mmap': True}]:
+        var = nnoir.load(path, lazy=True, **kwargs).functions[0].params['avg_var']
+        assert np.array_equal(var + 1.0, expected + 1.0)
+        assert np.array_equal(2.0 * var, 2.0 * expected)
+        assert np.array_equal(expected - var, np.zeros_like(expected))
+        assert np.array_equal(np.sqrt(var), np.sqrt(expected))
+        assert np.array_equal(np.concatenate([var, var]), np.concatenate([expected, expected]))
@@ -0,0 +1,212 @@
+import io
+import os
+import tempfile
+import nnoir
+import numpy as np
+
+
+def value(name, shape):
+    return nnoir.Value(name, np.zeros(shape).astype(np.float32))
+
+
+def encoded(array):
+    with io.BytesIO() as out:
+        np.save(out, array)
+        return {b'ndarray': out.getvalue()}
+
+
+def model_of(functions, inputs, outputs, shapes):
+    values = [value(name, shape) for name, shape in shapes.items()]
+    return nnoir.NNOIR(b'Optimize', b'nnoir_test', '0.1', inputs, outputs, values, functions)
+
+
+def assert_same_outputs(a, b, *xs):
+    ys = nnoir.Runtime(a).run(*xs)
+    zs = nnoir.Runtime(b).run(*xs)
+    if not isinstance(ys, tuple):
+        ys, zs = (ys,), (zs,)
+    for y, z in zip(ys, zs):
+        assert y.shape == z.shape
+        assert np.allclose(y, z, rtol=1e-4, atol=1e-4)
+
+
+def round_trip(model):
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, 'optimized.nnoir')
+        model.dump(path)
+        return nnoir.load(path)
+
+
+def random(*shape):
+    return np.random.randn(*shape).astype(np.float32)
+
+
+def test_fold_affine():
+    C = 4
+    shapes = {b'v0': (2, 3, 6, 6), b'v1': (2, C, 6, 6), b'v2': (2, C, 6, 6), b'v3': (2, C, 6, 6), b'v4': (2, C, 6, 6),
+              b'v5': (2, C, 6, 6), b'v6': (2, C, 6, 6), b'v7': (2, 2 * C, 6, 6), b'v8': (2, 2 * C, 6, 6),
+              b'v9': (2, 2 * C * 36), b'v10': (2, 5), b'v11': (2, 5)}
+    functions = [
+        nnoir.functions.Convolution2D([b'v0'], [b'v1'], W=random(C, 3, 3, 3), b=None, pad_h=(1, 1),
+                                      pad_w=(1, 1), stride=(1, 1), dilate=(1, 1), groups=1),
+        nnoir.functions.BatchNormalization([b'v1'], [b'v2'], eps=1e-5, avg_mean=random(C), avg_var=np.abs(random(C)),
+                                           gamma=random(C), beta=random(C)),
+        nnoir.functions.Scale([b'v2'], [b'v3'], axis=1, W=random(C), b=random(C)),
+        nnoir.functions.Bias([b'v3'], [b'v4'], axis=1, b=random(C)),
+        nnoir.functions.MulConstant([b'v4'], [b'v5'], value=0.5),
+        nnoir.functions.AddConstant([b'v5'], [b'v6'], value=1.0),
+        nnoir.functions.DepthwiseConvolution2D([b'v6'], [b'v7'], W=random(2, C, 3, 3), b=random(2 * C), stride=(1, 1),
+                                               pad_h=(1, 1), pad_w=(1, 1), dilate=(1, 1)),
+        nnoir.functions.BatchNormalization([b'v7'], [b'v8'], eps=1e-5, avg_mean=random(2 * C),
+                                           avg_var=np.abs(random(2 * C)), gamma=random(2 * C), beta=random(2 * C)),
+        nnoir.functions.Reshape([b'v8'], [b'v9'], shape=(2, 2 * C * 36)),
+        nnoir.functions.Linear([b'v9'], [b'v10'], W=random(5, 2 * C * 36), b=random(5)),
+        # a Bias along axis 0 is not channel-wise and stays
+        nnoir.functions.Bias([b'v10'], [b'v11'], axis=0, b=random(2)),
+    ]
+    model = model_of(functions, [b'v0'], [b'v11'], shapes)
+    folded = nnoir.optimize.fold_affine(model)
+    assert [type(f).__name__ for f in folded.functions] == \
+        ['Convolution2D', 'DepthwiseConvolution2D', 'Reshape', 'Linear', 'Bias']
+    assert len(folded.values) == 6
+    assert len(model.functions) == 11
+    x = random(2, 3, 6, 6)
+    assert_same_outputs(model, folded, x)
+    assert_same_outputs(model, round_trip(folded), x)
+    # params encoded by the converters are folded as well
+    functions = [nnoir.optimize.util.replace(functions[0], W=encoded(functions[0].params['W']))] + functions[1:]
+    assert_same_outputs(model, nnoir.optimize.fold_affine(model_of(functions, [b'v0'], [b'v11'], shapes)), x)
+
+
+def test_fold_affine_keeps_shared_values():
+    shapes = {b'v0': (2, 3), b'v1': (2, 4), b'v2': (2, 4), b'v3': (2, 4)}
+    functions = [
+        nnoir.functions.Linear([b'v0'], [b'v1'], W=random(4, 3), b=random(4)),
+        nnoir.functions.MulConstant([b'v1'], [b'v2'], value=2.0),
+        nnoir.functions.AddConstant([b'v1'], [b'v3'], value=2.0),
+    ]
+    model = model_of(functions, [b'v0'], [b'v2', b'v3'], shapes)
+    assert len(nnoir.optimize.fold_affine(model).functions) == 3
+    model = model_of(functions[:2], [b'v0'], [b'v1', b'v2'], shapes)
+    assert len(nnoir.optimize.fold_affine(model).functions) == 2
+
+
+def test_eliminate():
+    shapes = {b'v0': (2, 3), b'va': (2, 3), b'vb': (2, 3), b'vc': (2, 4), b'vd': (2, 4), b'v1': (2, 4),
+              b'vdead': (2, 4), b'vdead2': (2, 4), b'vout': (2, 4)}
+    functions = [
+        nnoir.functions.Dropout([b'v0'], [b'va']),
+        nnoir.functions.Reshape([b'va'], [b'vb'], shape=(2, 3)),
+        nnoir.functions.Linear([b'vb'], [b'vc'], W=random(4, 3), b=random(4)),
+        nnoir.functions.Transpose([b'vc'], [b'vd'], axes=(0, 1)),
+        nnoir.functions.ReLU([b'vd'], [b'v1']),
+        nnoir.functions.Linear([b'vc'], [b'vdead'], W=random(4, 4), b=random(4)),
+        nnoir.functions.Tanh([b'vdead'], [b'vdead2']),
+        nnoir.functions.Dropout([b'v1'], [b'vout']),
+    ]
+    model = model_of(functions, [b'v0'], [b'vout'], shapes)
+    report = {}
+    optimized = nnoir.optimize.eliminate(model, report)
+    assert [type(f).__name__ for f in optimized.functions] == ['Linear', 'ReLU']
+    assert report['functions'] == 6
+    assert report['values'] == 6
+    assert report['param_nbytes'] == 4 * (16 + 4)
+    assert report['value_nbytes'] == 4 * (2 * 3 * 2 + 2 * 4 * 4)
+    # intermediates are renumbered, inputs and outputs keep their names
+    assert optimized.functions[0].inputs == [b'v0']
+    assert optimized.functions[0].outputs == [b'v1']
+    assert optimized.functions[1].outputs == [b'vout']
+    assert sorted(v.name for v in optimized.values) == [b'v0', b'v1', b'vout']
+    x = random(2, 3)
+    assert_same_outputs(model, optimized, x)
+    assert_same_outputs(model, round_trip(optimized), x)
+
+
+def test_eliminate_keeps_input_to_output_identity():
+    shapes = {b'v0': (2, 3), b'v1': (2, 3)}
+    model = model_of([nnoir.functions.Dropout([b'v0'], [b'v1'])], [b'v0'], [b'v1'], shapes)
+    assert len(nnoir.optimize.eliminate(model).functions) == 1
+
+
+def test_fold_padding():
+    shapes = {b'v0': (2, 3, 6, 6), b'v1': (2, 3, 9, 8), b'v2': (2, 4, 9, 8), b'v3': (2, 4, 11, 10),
+              b'v4': (2, 4, 5, 5), b'v5': (2, 4, 6, 6), b'v6': (2, 4, 6, 6), b'v7': (2, 4, 4, 4),
+              b'v8': (2, 4, 5, 5), b'v9': (2, 4, 4, 4)}
+    functions = [
+        nnoir.functions.ConstantPadding([b'v0'], [b'v1'], pads=((0, 0), (0, 0), (1, 2), (0, 2)), value=0.0),
+        nnoir.functions.Convolution2D([b'v1'], [b'v2'], W=random(4, 3, 3, 3), b=random(4), pad_h=(1, 1),
+                                      pad_w=(1, 1), stride=(1, 1), dilate=(1, 1), groups=1),
+        nnoir.functions.ConstantPadding([b'v2'], [b'v3'], pads=((0, 0), (0, 0), (1, 1), (1, 1)), value=-np.inf),
+        nnoir.functions.MaxPooling2D([b'v3'], [b'v4'], kernel=(3, 3), stride=(2, 2), pad_h=(0, 0), pad_w=(0, 0)),
+        # padding with a value the consumer cannot express stays
+        nnoir.functions.ConstantPadding([b'v4'], [b'v5'], pads=((0, 0), (0, 0), (0, 1), (0, 1)), value=1.0),
+        nnoir.functions.AveragePooling2D([b'v5'], [b'v7'], kernel=(3, 3), stride=(1, 1), pad_h=(0, 0), pad_w=(0, 0),
+                                         count_exclude_pad=False),
+        nnoir.functions.ConstantPadding([b'v4'], [b'v6'], pads=((0, 0), (0, 0), (0, 1), (0, 1)), value=0.0),
+        nnoir.functions.AveragePooling2D([b'v6'], [b'v8'], kernel=(2, 2), stride=(1, 1), pad_h=(0, 0), pad_w=(0, 0),
+                                         count_exclude_pad=False),
+        nnoir.functions.MaxPooling2D([b'v8'], [b'v9'], kernel=(2, 2), stride=(1, 1), pad_h=(0, 0), pad_w=(0, 0)),
+    ]
+    model = model_of(functions, [b'v0'], [b'v7', b'v9'], shapes)
+    folded = nnoir.optimize.fold_padding(model)
+    assert [type(f).__name__ for f in folded.functions] == \
+        ['Convolution2D', 'MaxPooling2D', 'ConstantPadding', 'AveragePooling2D', 'AveragePooling2D', 'MaxPooling2D']
+    assert folded.functions[0].params['pad_h'] == (2, 3)
+    assert folded.functions[0].params['pad_w'] == (1, 3)
+    assert folded.functions[1].params['pad_h'] == (1, 1)
+    x = random(2, 3, 6, 6)
+    assert_same_outputs(model, folded, x)
+    assert_same_outputs(model, round_trip(folded), x)
+
+
+def test_simplify_layout():
+    shapes = {b'v0': (2, 3, 4, 5), b'v1': (2, 5, 3, 4), b'v2': (2, 4, 5, 3), b'v3': (2, 60), b'v4': (2, 6),
+              b'v5': (2, 3, 4, 5), b'v6': (12, 10), b'v7': (2, 60), b'v8': (2, 5, 3, 4), b'v9': (2, 3, 4, 5)}
+    functions = [
+        # composed into one transposition, then folded into W
+        nnoir.functions.Transpose([b'v0'], [b'v1'], axes=(0, 3, 1, 2)),
+        nnoir.functions.Transpose([b'v1'], [b'v2'], axes=(0, 3, 1, 2)),
+        nnoir.functions.Reshape([b'v2'], [b'v3'], shape=(2, 60)),
+        nnoir.functions.Linear([b'v3'], [b'v4'], W=random(6, 60), b=random(6)),
+        # merged into one reshape; the Dropout is left to eliminate()
+        nnoir.functions.Dropout([b'v0'], [b'v5']),
+        nnoir.functions.Reshape([b'v5'], [b'v6'], shape=(12, 10)),
+        nnoir.functions.Reshape([b'v6'], [b'v7'], shape=(2, -1)),
+        # cancel each other
+        nnoir.functions.Transpose([b'v0'], [b'v8'], axes=(0, 3, 1, 2)),
+        nnoir.functions.Transpose([b'v8'], [b'v9'], axes=(0, 2, 3, 1)),
+    ]
+    model = model_of(functions, [b'v0'], [b'v4', b'v7', b'v9'], shapes)
+    simplified = nnoir.optimize.simplify_layout(model)
+    assert [type(f).__name__ for f in simplified.functions] == ['Reshape', 'Linear', 'Dropout', 'Reshape', 'Transpose']
+    assert simplified.functions[0].inputs == [b'v0']
+    assert simplified.functions[3].params['shape'] == (2, -1)
+    # v9 is an output fed by an input, so an identity Transpose must stay
+    assert simplified.functions[4].params['axes'] == (0, 1, 2, 3)
+    x = random(2, 3, 4, 5)
+    assert_same_outputs(model, simplified, x)
+    assert_same_outputs(model, round_trip(simplified), x)
+
+
+def test_fold_constants():
+    shapes = {b'v0': (2, 3), b'v1': (3, 2), b'v2': (2, 3), b'v3': (2, 3), b'v4': (2, 3), b'v5': (4, 2, 3)}
+    functions = [
+        nnoir.functions.Constant([], [b'v1'], value=random(3, 2)),
+        nnoir.functions.Transpose([b'v1'], [b'v2'], axes=(1, 0)),
+        nnoir.functions.MulConstant([b'v2'], [b'v3'], value=2.0),
+        nnoir.functions.Add([b'v0', b'v3'], [b'v4']),
+        # too large to be folded with max_bytes=64
+        nnoir.functions.BroadcastTo([b'v3'], [b'v5']),
+    ]
+    model = model_of(functions, [b'v0'], [b'v4', b'v5'], shapes)
+    folded = nnoir.optimize.fold_constants(model, max_bytes=64)
+    assert [type(f).__name__ for f in folded.functions] == ['Constant', 'Add', 'BroadcastTo']
+    assert folded.functions[0].outputs == [b'v3']
+    assert sorted(v.name for v in folded.values) == [b'v0', b'v3', b'v4', b'v5']
+    assert len(model.functions) == 5
+    x = random(2, 3)
+    assert_same_outputs(model, folded, x)
+    assert_same_outputs(model, round_trip(folded), x)
+    folded = nnoir.optimize.fold_constants(model)
+    assert [type(f).__name__ for f in folded.functions] == ['Constant', 'Add', 'Constant']
+    assert_same_outputs(model, folded, x)
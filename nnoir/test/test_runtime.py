@@ -0,0 +1,262 @@
+import os
+import tempfile
+import nnoir
+import numpy as np
+from helpers import nnoir_files
+
+
+def value(name, shape):
+    return nnoir.Value(name, np.zeros(shape).astype(np.float32))
+
+
+def mlp():
+    W1 = np.random.randn(5, 3).astype(np.float32)
+    b1 = np.random.randn(5).astype(np.float32)
+    W2 = np.random.randn(4, 5).astype(np.float32)
+    b2 = np.random.randn(4).astype(np.float32)
+    values = [value(b'v0', (2, 3)), value(b'v1', (2, 5)), value(b'v2', (2, 5)),
+              value(b'v3', (2, 5)), value(b'v4', (2, 5)), value(b'v5', (2, 4))]
+    # listed in reverse dependency order on purpose
+    functions = [
+        nnoir.functions.Linear([b'v4'], [b'v5'], W=W2, b=b2),
+        nnoir.functions.Add([b'v2', b'v3'], [b'v4']),
+        nnoir.functions.ReLU([b'v1'], [b'v2']),
+        nnoir.functions.Tanh([b'v1'], [b'v3']),
+        nnoir.functions.Linear([b'v0'], [b'v1'], W=W1, b=b1),
+    ]
+    model = nnoir.NNOIR(b'MLP', b'nnoir_test', '0.1', [b'v0'], [b'v5', b'v2'], values, functions)
+
+    def expected(x):
+        h = x.dot(W1.T) + b1
+        return (np.maximum(h, 0) + np.tanh(h)).dot(W2.T) + b2, np.maximum(h, 0)
+    return model, expected
+
+
+def test_runtime():
+    model, expected = mlp()
+    runtime = nnoir.Runtime(model)
+    assert [f.__class__.__name__ for f in runtime.schedule] == ['Linear', 'ReLU', 'Tanh', 'Add', 'Linear']
+    x = np.random.randn(2, 3).astype(np.float32)
+    for y, e in zip(runtime.run(x), expected(x)):
+        assert np.allclose(y, e, atol=1e-5)
+    for y, e in zip(runtime({b'v0': x}), expected(x)):
+        assert np.allclose(y, e, atol=1e-5)
+
+
+def test_runtime_single_functions():
+    for path in nnoir_files():
+        model = nnoir.load(path)
+        values = {v.name: v for v in model.values}
+        xs = [np.random.randn(*values[name].shape).astype(np.float32) for name in model.inputs]
+        function = model.functions[0]
+        if isinstance(function, nnoir.functions.BroadcastTo):
+            expected = function.run(*xs, tuple(values[model.outputs[0]].shape))
+        else:
+            expected = function.run(*xs)
+        assert np.array_equal(nnoir.Runtime(model).run(*xs), expected)
+
+
+def test_runtime_lazy():
+    with tempfile.TemporaryDirectory() as d:
+        for path in nnoir_files():
+            model = nnoir.load(path)
+            v1_path = os.path.join(d, os.path.basename(path))
+            model.dump(v1_path, version=1)
+            values = {v.name: v for v in model.values}
+            xs = [np.random.randn(*values[name].shape).astype(np.float32) for name in model.inputs]
+            expected = nnoir.Runtime(model).run(*xs)
+            for lazy in [nnoir.load(path, lazy=True), nnoir.load(v1_path, lazy=True)]:
+                assert np.array_equal(nnoir.Runtime(lazy).run(*xs), expected)
+            # close the mapping of v1_path before the directory is removed
+            del lazy
+
+
+def test_runtime_invalid_graph():
+    values = [value(b'v0', (2, 3)), value(b'v1', (2, 3)), value(b'v2', (2, 3))]
+    functions = [nnoir.functions.ReLU([b'v2'], [b'v1']),
+                 nnoir.functions.ReLU([b'v1'], [b'v2'])]
+    model = nnoir.NNOIR(b'Cycle', b'nnoir_test', '0.1', [b'v0'], [b'v2'], values, functions)
+    try:
+        nnoir.Runtime(model)
+        assert False
+    except nnoir.nnoir.InvalidNNOIRData:
+        pass
+
+
+def test_runtime_memory_plan():
+    model, expected = mlp()
+    runtime = nnoir.Runtime(model)
+    plan = runtime.memory_plan
+    # v1 (2x5) feeds ReLU and Tanh, v3 and v4 are intermediates; v2 and v5 are outputs
+    assert set(plan.sizes.keys()) == {b'v1', b'v3', b'v4'}
+    assert plan.naive_size == 3 * 40
+    assert plan.peak <= plan.arena_size <= plan.naive_size
+    for a in plan.sizes:
+        for b in plan.sizes:
+            if a < b and plan.offsets[a] < plan.offsets[b] + plan.sizes[b] and plan.offsets[b] < plan.offsets[a] + plan.sizes[a]:
+                (fa, la), (fb, lb) = plan.lifetimes[a], plan.lifetimes[b]
+                assert la < fb or lb < fa
+    x = np.random.randn(2, 3).astype(np.float32)
+    arena_runtime = nnoir.Runtime(model, arena=True)
+    for _ in range(2):
+        for y, e in zip(arena_runtime.run(x), expected(x)):
+            assert np.allclose(y, e, atol=1e-5)
+    assert 'arena' in plan.report()
+
+
+def test_memory_plan_chain():
+    n = 8
+    values = [value('v{}'.format(i).encode(), (4, 16)) for i in range(n + 1)]
+    functions = [nnoir.functions.ReLU(['v{}'.format(i).encode()], ['v{}'.format(i + 1).encode()]) for i in range(n)]
+    model = nnoir.NNOIR(b'Chain', b'nnoir_test', '0.1', [b'v0'], ['v{}'.format(n).encode()], values, functions)
+    plan = nnoir.Runtime(model, fuse=False).memory_plan
+    # a chain only ever needs two intermediates at a time
+    assert plan.naive_size == (n - 1) * 256
+    assert plan.peak == 2 * 256
+    assert plan.arena_size == 2 * 256
+    # fused, the chain is a single step without intermediates
+    runtime = nnoir.Runtime(model, arena=True)
+    assert runtime.chains == [list(range(n))]
+    assert runtime.memory_plan.arena_size == 0
+    x = np.random.randn(4, 16).astype(np.float32)
+    assert np.array_equal(runtime.run(x), np.maximum(x, 0))
+
+
+def test_runtime_fused_chains():
+    names = [b'vx', b'v0', b'v1', b'v2', b'v3', b'v4', b'v5', b'v6', b'vy', b'vz']
+    values = [value(name, (2, 3)) for name in names]
+    W = np.random.randn(3, 3).astype(np.float32)
+    functions = [
+        nnoir.functions.Dropout([b'vx'], [b'v0']),
+        nnoir.functions.ReLU([b'v0'], [b'v1']),
+        nnoir.functions.Linear([b'v1'], [b'v2'], W=W, b=None),
+        nnoir.functions.MulConstant([b'v2'], [b'v3'], value=2.0),
+        nnoir.functions.AddConstant([b'v3'], [b'v4'], value=-1.0),
+        nnoir.functions.ClippedReLU([b'v4'], [b'vy'], upper=1.5),
+        nnoir.functions.Sigmoid([b'v4'], [b'v5']),
+        # negative inputs for LeakyReLU
+        nnoir.functions.AddConstant([b'v5'], [b'v6'], value=-0.5),
+        nnoir.functions.LeakyReLU([b'v6'], [b'vz'], slope=0.1),
+    ]
+    model = nnoir.NNOIR(b'Chains', b'nnoir_test', '0.1', [b'vx'], [b'vy', b'vz'], values, functions)
+    runtime = nnoir.Runtime(model)
+    # v4 has two consumers, so the chain through it ends there
+    assert runtime.chains == [[0, 1], [2, 3, 4], [5], [6, 7, 8]]
+    x = np.random.randn(2, 3).astype(np.float32)
+    x[0] = -1  # v4[0] == -1, so LeakyReLU gets negative inputs
+    x_ = x.copy()
+    y, z = runtime.run(x)
+    assert np.array_equal(x, x_)
+    v4 = np.maximum(x, 0).dot(W.T) * 2 - 1
+    assert np.allclose(y, np.clip(v4, 0, 1.5), atol=1e-5)
+    v6 = 1 / (1 + np.exp(-v4)) - 0.5
+    assert np.allclose(z, np.where(v6 < 0, 0.1 * v6, v6), atol=1e-5)
+    ys = nnoir.Runtime(model, fuse=False).run(x)
+    assert np.allclose(y, ys[0]) and np.allclose(z, ys[1])
+
+
+def test_elementwise_out():
+    x = np.random.randn(4, 3, 2, 2).astype(np.float32)
+    functions = [
+        nnoir.functions.ReLU([b'x'], [b'y']),
+        nnoir.functions.LeakyReLU([b'x'], [b'y'], slope=0.2),
+        nnoir.functions.LeakyReLU([b'x'], [b'y'], slope=3.0),
+        nnoir.functions.ELU([b'x'], [b'y'], alpha=0.5),
+        nnoir.functions.Tanh([b'x'], [b'y']),
+        nnoir.functions.Sigmoid([b'x'], [b'y']),
+        nnoir.functions.ClippedReLU([b'x'], [b'y'], upper=0.5),
+        nnoir.functions.AddConstant([b'x'], [b'y'], value=2.0),
+        nnoir.functions.MulConstant([b'x'], [b'y'], value=2.0),
+        nnoir.functions.Bias([b'x'], [b'y'], axis=1, b=np.arange(3, dtype=np.float32)),
+        nnoir.functions.Scale([b'x'], [b'y'], axis=1, W=np.arange(3, dtype=np.float32), b=np.ones(3, dtype=np.float32)),
+        nnoir.functions.Dropout([b'x'], [b'y']),
+    ]
+    for f in functions:
+        expected = f.run(x)
+        assert expected.dtype == np.float32
+        out = np.full_like(x, np.nan)
+        assert f.run(x, out=out) is out
+        assert np.allclose(out, expected)
+        y = x.copy()
+        assert f.run(y, out=y) is y
+        assert np.allclose(y, expected)
+    assert np.allclose(functions[1].run(x), np.where(x < 0, 0.2 * x, x))
+    assert np.allclose(functions[2].run(x), np.where(x < 0, 3.0 * x, x))
+    assert np.allclose(functions[3].run(x), np.where(x < 0, 0.5 * np.expm1(x), x))
+
+
+def test_runtime_arena_views():
+    # v2 is a view of v1, whose slot is reused by v3 once v1 is dropped
+    W = np.random.randn(4, 6).astype(np.float32)
+    values = [value(b'v0', (2, 6)), value(b'v1', (2, 6)), value(b'v2', (3, 4)), value(b'v3', (2, 6)), value(b'v4', (2, 4))]
+    functions = [
+        nnoir.functions.ReLU([b'v0'], [b'v1']),
+        nnoir.functions.Reshape([b'v1'], [b'v2'], shape=(3, 4)),
+        nnoir.functions.Tanh([b'v0'], [b'v3']),
+        nnoir.functions.Linear([b'v3'], [b'v4'], W=W, b=None),
+    ]
+    model = nnoir.NNOIR(b'Views', b'nnoir_test', '0.1', [b'v0'], [b'v2', b'v4'], values, functions)
+    runtime = nnoir.Runtime(model, arena=True)
+    assert runtime.memory_plan.offsets[b'v1'] == runtime.memory_plan.offsets[b'v3']
+    x = np.random.randn(2, 6).astype(np.float32)
+    for _ in range(2):
+        y, z = runtime.run(x)
+        assert np.array_equal(y, np.maximum(x, 0).reshape(3, 4))
+        assert np.allclose(z, np.tanh(x).dot(W.T), atol=1e-5)
+        assert not np.may_share_memory(y, runtime.arena)
+
+
+def test_runtime_arena_fused():
+    # the fused ReLU runs at the position of the first Linear, before v2 is computed
+    Ws = [np.random.randn(4, 4).astype(np.float32) for _ in range(3)]
+    values = [value(name, (2, 4)) for name in [b'v0', b'v1', b'v2', b'v3', b'v4', b'v5']]
+    functions = [
+        nnoir.functions.Linear([b'v0'], [b'v1'], W=Ws[0], b=None),
+        nnoir.functions.Linear([b'v0'], [b'v2'], W=Ws[1], b=None),
+        nnoir.functions.Linear([b'v2'], [b'v5'], W=Ws[2], b=None),
+        nnoir.functions.ReLU([b'v1'], [b'v3']),
+        nnoir.functions.Add([b'v5', b'v3'], [b'v4']),
+    ]
+    model = nnoir.NNOIR(b'Fused', b'nnoir_test', '0.1', [b'v0'], [b'v4'], values, functions)
+    runtime = nnoir.Runtime(model, arena=True)
+    assert runtime.chains == [[0, 3], [1], [2], [4]]
+    x = np.random.randn(2, 4).astype(np.float32)
+    expected = nnoir.Runtime(model, fuse=False).run(x)
+    for _ in range(2):
+        assert np.allclose(runtime.run(x), expected, atol=1e-5)
+        assert np.allclose(nnoir.Runtime(model, arena=True, fuse=False).run(x), expected, atol=1e-5)
+
+
+def test_runtime_arena_out():
+    # Convolution2D with the fused ReLU and Linear compute into their slots
+    W1 = np.random.randn(4, 3, 3, 3).astype(np.float32)
+    W2 = np.random.randn(5, 64).astype(np.float32)
+    b2 = np.random.randn(5).astype(np.float32)
+    values = [value(b'v0', (2, 3, 4, 4)), value(b'v1', (2, 4, 4, 4)), value(b'v2', (2, 4, 4, 4)),
+              value(b'v3', (2, 64)), value(b'v4', (2, 5)), value(b'v5', (2, 5)), value(b'v6', (2, 5))]
+    functions = [
+        nnoir.functions.Convolution2D([b'v0'], [b'v1'], W=W1, b=None, pad_h=(1, 1), pad_w=(1, 1), stride=(1, 1),
+                                      dilate=(1, 1), groups=1),
+        nnoir.functions.ReLU([b'v1'], [b'v2']),
+        nnoir.functions.Reshape([b'v2'], [b'v3'], shape=(2, 64)),
+        nnoir.functions.Linear([b'v3'], [b'v4'], W=W2, b=b2),
+        nnoir.functions.Tanh([b'v4'], [b'v5']),
+        nnoir.functions.Sigmoid([b'v4'], [b'v6']),
+    ]
+    model = nnoir.NNOIR(b'Out', b'nnoir_test', '0.1', [b'v0'], [b'v5', b'v6'], values, functions)
+    runtime = nnoir.Runtime(model, arena=True)
+    x = np.random.randn(2, 3, 4, 4).astype(np.float32)
+    expected = nnoir.Runtime(model).run(x)
+    outs = []
+    for f in [functions[0], functions[3]]:
+        f.run = recording(f.run, outs)
+    for y, e in zip(runtime.run(x), expected):
+        assert np.allclose(y, e, atol=1e-5)
+    assert outs[0] is runtime.slots[b'v2'] and outs[1] is runtime.slots[b'v4']
+
+
+def recording(run, outs):
+    def wrapper(*args, out=None):
+        outs.append(out)
+        return run(*args, out=out)
+    return wrapper
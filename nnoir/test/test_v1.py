@@ -0,0 +1,120 @@
+import os
+import tempfile
+import nnoir
+import numpy as np
+from nnoir import compression
+from nnoir.reader import Reader
+from helpers import nnoir_files
+
+
+def test_v1_roundtrip():
+    with tempfile.TemporaryDirectory() as d:
+        for path in nnoir_files():
+            model = nnoir.load(path)
+            v1_path = os.path.join(d, os.path.basename(path))
+            model.dump(v1_path, version=1)
+            with open(v1_path, 'rb') as f:
+                assert f.read() == model.pack(version=1)
+            for kwargs in [{}, {'mmap': True}, {'lazy': True}]:
+                assert nnoir.load(v1_path, **kwargs).pack() == model.pack()
+                assert nnoir.load(v1_path, **kwargs).pack(version=1) == model.pack(version=1)
+
+
+def test_v1_layout():
+    W = np.random.randn(7, 4, 3, 3).astype(np.float32)
+    b = np.random.randn(7).astype(np.float32)
+    inputs = [nnoir.Value(b'v0', np.zeros((1, 4, 5, 5)).astype(np.float32))]
+    outputs = [nnoir.Value(b'v1', np.zeros((1, 7, 3, 3)).astype(np.float32))]
+    functions = [nnoir.functions.Convolution2D([b'v0'], [b'v1'], W=W, b=b, pad_h=(0, 0), pad_w=(0, 0),
+                                               stride=(1, 1), dilate=(1, 1), groups=1)]
+    model = nnoir.NNOIR(b'Conv', b'nnoir_test', '0.1', [b'v0'], [b'v1'], inputs + outputs, functions)
+    buf = model.pack(version=1)
+    reader = Reader(buf)
+    header = reader.read()
+    assert header[b'nnoir'][b'version'] == 1
+    params = header[b'nnoir'][b'model'][b'functions'][0][b'params']
+    start = (reader.pos + 63) // 64 * 64
+    for name, expected in [(b'W', W), (b'b', b)]:
+        entry = header[b'nnoir'][b'tensors'][params[name][b'tensor']]
+        assert (start + entry[b'offset']) % 64 == 0
+        assert entry[b'length'] == expected.nbytes
+        assert entry[b'dtype'] == b'<f4'
+        assert tuple(entry[b'shape']) == expected.shape
+        data = buf[start + entry[b'offset']:start + entry[b'offset'] + entry[b'length']]
+        assert data == expected.tobytes()
+
+
+def activation_model(name, function):
+    values = [nnoir.Value(b'v0', np.zeros((2, 3)).astype(np.float32)),
+              nnoir.Value(b'v1', np.zeros((2, 3)).astype(np.float32))]
+    return nnoir.NNOIR(name, b'nnoir_test', '0.1', [b'v0'], [b'v1'], values,
+                       [getattr(nnoir.functions, function)([b'v0'], [b'v1'])])
+
+
+def test_v1_deduplication():
+    W = np.random.randn(3, 3).astype(np.float32)
+    b = np.random.randn(3).astype(np.float32)
+    values = [nnoir.Value(name, np.zeros((2, 3)).astype(np.float32)) for name in [b'v0', b'v1', b'v2', b'v3']]
+    sigmoid = activation_model(b'sigmoid', 'Sigmoid')
+    functions = [
+        nnoir.functions.Linear([b'v0'], [b'v1'], W=W, b=b),
+        nnoir.functions.Linear([b'v1'], [b'v2'], W=W.copy(), b=b.copy()),
+        nnoir.functions.LSTM([b'v2'], [b'v3'], upward=activation_model(b'linear', 'Tanh'),
+                             lateral=activation_model(b'linear', 'Tanh'),
+                             activation_input=sigmoid, activation_output=sigmoid, activation_forget=sigmoid,
+                             activation_cell=activation_model(b'tanh', 'Tanh'),
+                             activation_hidden=activation_model(b'tanh', 'Tanh'),
+                             peephole_input=None, peephole_output=None, peephole_forget=None),
+    ]
+    model = nnoir.NNOIR(b'Tied', b'nnoir_test', '0.1', [b'v0'], [b'v3'], values, functions)
+    header = Reader(model.pack(version=1)).read()
+    assert len(header[b'nnoir'][b'tensors']) == 2
+    assert len(header[b'nnoir'][b'models']) == 3
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, 'tied.nnoir')
+        model.dump(path, version=1)
+        for kwargs in [{}, {'mmap': True}, {'lazy': True}]:
+            loaded = nnoir.load(path, **kwargs)
+            assert loaded.functions[0].params['W'] is loaded.functions[1].params['W']
+            assert loaded.functions[0].params['b'] is loaded.functions[1].params['b']
+            lstm = loaded.functions[2].params
+            assert lstm['activation_input'] is lstm['activation_forget']
+            assert lstm['activation_cell'] is lstm['activation_hidden']
+            assert lstm['upward'] is lstm['lateral']
+            assert loaded.pack() == model.pack()
+        model.dump(path)
+        assert nnoir.load(path).pack() == model.pack()
+
+
+def test_v1_compression():
+    W = np.round(np.random.randn(64, 32, 3, 3), 1).astype(np.float32)
+    b = np.zeros(64, dtype=np.float32)
+    inputs = [nnoir.Value(b'v0', np.zeros((1, 32, 5, 5)).astype(np.float32))]
+    outputs = [nnoir.Value(b'v1', np.zeros((1, 64, 3, 3)).astype(np.float32))]
+    functions = [nnoir.functions.Convolution2D([b'v0'], [b'v1'], W=W, b=b, pad_h=(0, 0), pad_w=(0, 0),
+                                               stride=(1, 1), dilate=(1, 1), groups=1)]
+    model = nnoir.NNOIR(b'Conv', b'nnoir_test', '0.1', [b'v0'], [b'v1'], inputs + outputs, functions)
+    raw_size = len(model.pack(version=1))
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, 'conv.nnoir')
+        for codec in ['zlib', 'lzma']:
+            for shuffle in [False, True]:
+                model.dump(path, version=1, compression=codec, shuffle=shuffle)
+                with open(path, 'rb') as f:
+                    packed = f.read()
+                assert packed == model.pack(version=1, compression=codec, shuffle=shuffle)
+                assert len(packed) < raw_size
+                for kwargs in [{}, {'mmap': True}, {'lazy': True}]:
+                    loaded = nnoir.load(path, **kwargs)
+                    assert np.array_equal(np.asarray(loaded.functions[0].params['W']), W)
+                    assert np.array_equal(np.asarray(loaded.functions[0].params['b']), b)
+                    assert loaded.pack() == model.pack()
+
+
+def test_compression_chunks():
+    x = np.random.randn(1000, 3).astype(np.float64)
+    chunks, info = compression.compress(x, b'zlib', shuffle=True, chunk_size=1000)
+    assert len(chunks) == 24
+    entry = {b'offset': 0, b'dtype': b'<f8', b'shape': [1000, 3]}
+    entry.update(info)
+    assert np.array_equal(compression.decompress(b''.join(chunks), entry), x)